@@ -0,0 +1,384 @@
+#! /usr/bin/env python3
+
+"""
+# -----------------------------------------------------------------------------
+# benchmark.py
+#   Benchmark dockerhub-util.py against a local stand-in for the DockerHub API.
+#   No network access is needed.
+# -----------------------------------------------------------------------------
+"""
+
+# Import from standard library. https://docs.python.org/3/library/
+
+import argparse
+import functools
+import hashlib
+import http.server
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+# Metadata
+
+__all__: list[str] = []
+__version__ = "1.0.0"
+__date__ = "2026-10-18"
+__updated__ = "2026-10-18"
+
+DOCKERHUB_UTIL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dockerhub-util.py"
+)
+LAST_UPDATED = "2026-01-01T00:00:00.000000Z"
+MAXIMUM_PAGE_SIZE = 100
+STARTUP_SUBCOMMANDS = [
+    "version",
+    "print-image-names",
+    "docker-acceptance-test",
+    "print-latest-versions",
+    "print-active-image-names",
+]
+
+# -----------------------------------------------------------------------------
+# Fake DockerHub
+# -----------------------------------------------------------------------------
+
+
+def repository_names(repositories):
+    """Return generated repository names in name order."""
+    return ["repository-{0:05d}".format(x) for x in range(repositories)]
+
+
+def write_catalog(catalog_file, repositories):
+    """Write a catalog with an entry for every generated repository.
+
+    The benchmarked runs read it instead of the built-in catalog, so they
+    resolve the fake's repositories and never reach a real registry.
+    """
+    catalog = {
+        name: {
+            "environment_variable": "SENZING_DOCKER_IMAGE_VERSION_{0}".format(
+                name.upper().replace("-", "_")
+            )
+        }
+        for name in repository_names(repositories)
+    }
+    with open(catalog_file, "w", encoding="utf-8") as output_file:
+        json.dump(catalog, output_file, indent=2, sort_keys=True)
+
+
+class FakeDockerHub(http.server.ThreadingHTTPServer):
+    """Serve /v2/repositories and /tags endpoints from generated data."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        repositories,
+        tags,
+        latency_in_seconds,
+        maximum_page_size,
+        request_count,
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        super().__init__(address, FakeDockerHubRequestHandler)
+        self.repositories = repositories
+        self.tags = tags
+        self.latency_in_seconds = latency_in_seconds
+        self.maximum_page_size = maximum_page_size
+        self.request_count = request_count
+        self.page = functools.lru_cache(maxsize=4096)(self.render_page)
+
+    @property
+    def endpoint(self):
+        """Return the URL to use as SENZING_DOCKERHUB_API_ENDPOINT_V2."""
+        return "http://{0}:{1}/v2".format(*self.server_address)
+
+    def count_request(self):
+        """Count one request in the counter shared with the benchmark process."""
+        with self.request_count.get_lock():
+            self.request_count.value += 1
+
+    def tag(self, name):
+        """Return a tag object shaped like DockerHub's."""
+        digest = "sha256:" + hashlib.sha256(name.encode()).hexdigest()
+        return {
+            "digest": digest,
+            "images": [
+                {
+                    "architecture": architecture,
+                    "digest": digest,
+                    "os": "linux",
+                    "size": 123456789,
+                    "status": "active",
+                }
+                for architecture in ["amd64", "arm64"]
+            ],
+            "last_updated": LAST_UPDATED,
+            "name": name,
+        }
+
+    def tag_names(self):
+        """Return generated tag names, newest first, as DockerHub lists them."""
+        result = ["latest"]
+        for index in reversed(range(self.tags - 1)):
+            result.append(
+                "{0}.{1}.{2}".format(index // 10000, index // 100 % 100, index % 100)
+            )
+        return result
+
+    def render_page(self, path, namespace, repository, page, page_size):
+        """Return the JSON body of one page."""
+        if repository is None:
+            items = [
+                {"last_updated": LAST_UPDATED, "name": name, "namespace": namespace}
+                for name in repository_names(self.repositories)
+            ]
+        else:
+            items = self.tag_names()
+        count = len(items)
+        start = (page - 1) * page_size
+        results = items[start : start + page_size]
+        if repository is not None:
+            results = [self.tag(name) for name in results]
+        next_url = None
+        if start + page_size < count:
+            next_url = "{0}{1}?page={2}&page_size={3}".format(
+                self.endpoint[: -len("/v2")], path, page + 1, page_size
+            )
+        return json.dumps(
+            {"count": count, "next": next_url, "previous": None, "results": results}
+        ).encode()
+
+
+class FakeDockerHubRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Answer DockerHub API requests."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer a GET request."""
+        self.server.count_request()
+        if self.server.latency_in_seconds:
+            time.sleep(self.server.latency_in_seconds)
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        page_size = min(
+            int(query.get("page_size", ["10"])[0]), self.server.maximum_page_size
+        )
+        parts = [x for x in url.path.split("/") if x]
+        if parts[:2] != ["v2", "repositories"] or len(parts) not in [3, 5, 6]:
+            self.send_body(404, b"{}")
+        elif len(parts) == 3:
+            self.send_body(
+                200, self.server.page(url.path, parts[2], None, page, page_size)
+            )
+        elif parts[4] != "tags":
+            self.send_body(404, b"{}")
+        elif len(parts) == 6:
+            self.send_body(200, json.dumps(self.server.tag(parts[5])).encode())
+        else:
+            self.send_body(
+                200, self.server.page(url.path, parts[2], parts[3], page, page_size)
+            )
+
+    def send_body(self, status_code, body):
+        """Send a JSON body, or 304 if the client already has it."""
+        etag = '"{0}"'.format(hashlib.sha256(body).hexdigest())
+        if status_code == 200 and self.headers.get("If-None-Match") == etag:
+            status_code, body = 304, b""
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def serve_fake_dockerhub(arguments, request_count, endpoint_queue):
+    """Run a FakeDockerHub until the process is terminated."""
+    server = FakeDockerHub(("127.0.0.1", 0), *arguments, request_count)
+    endpoint_queue.put(server.endpoint)
+    server.serve_forever()
+
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)]
+
+
+def run_once(command, env):
+    """Run a command, returning (exit code, elapsed seconds, peak RSS in KiB)."""
+    start_time = time.perf_counter()
+    with subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) as process:
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, time.perf_counter() - start_time, rusage.ru_maxrss
+
+
+def benchmark(
+    endpoint, request_count, subcommand, iterations, extra_args, catalog_file
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """Run one subcommand repeatedly and summarize the runs."""
+    env = dict(os.environ)
+    env["SENZING_CATALOG_FILE"] = catalog_file
+    env["SENZING_DOCKERHUB_API_ENDPOINT_V2"] = endpoint
+    env["SENZING_LOG_LEVEL"] = "error"
+    command = [sys.executable, DOCKERHUB_UTIL, subcommand] + extra_args
+
+    # The "python" baseline is the bare interpreter, to separate dockerhub-util.py's
+    # own startup cost from Python's.
+
+    if subcommand == "python":
+        command = [sys.executable, "-c", "pass"]
+    elapsed_times = []
+    peak_rss = 0
+    requests_before = request_count.value
+    for _ in range(iterations):
+        exit_code, elapsed_time, rss = run_once(command, env)
+        if exit_code != 0:
+            raise RuntimeError(
+                "{0} exited with {1}".format(" ".join(command), exit_code)
+            )
+        elapsed_times.append(elapsed_time)
+        peak_rss = max(peak_rss, rss)
+    requests_per_run = (request_count.value - requests_before) / iterations
+    return {
+        "iterations": iterations,
+        "run_p50_seconds": round(percentile(elapsed_times, 0.50), 4),
+        "run_p99_seconds": round(percentile(elapsed_times, 0.99), 4),
+        "peak_rss_kib": peak_rss,
+        "requests_per_run": requests_per_run,
+        "requests_per_second": round(
+            requests_per_run * iterations / sum(elapsed_times), 1
+        ),
+        "subcommand": subcommand,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+
+
+def get_parser():
+    """Parse commandline arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip("# -\n"))
+    parser.add_argument(
+        "--iterations", type=int, default=5, help="Runs per subcommand. Default: 5"
+    )
+    parser.add_argument(
+        "--latency-in-seconds",
+        type=float,
+        default=0.02,
+        help="Delay added to every response. Default: 0.02",
+    )
+    parser.add_argument(
+        "--maximum-page-size",
+        type=int,
+        default=MAXIMUM_PAGE_SIZE,
+        help="Largest page_size the fake DockerHub honors, like DockerHub's cap. Default: {0}".format(
+            MAXIMUM_PAGE_SIZE
+        ),
+    )
+    parser.add_argument(
+        "--repositories",
+        type=int,
+        default=1000,
+        help="Repositories in the organization. Default: 1000",
+    )
+    parser.add_argument(
+        "--tags", type=int, default=5000, help="Tags in every repository. Default: 5000"
+    )
+    parser.add_argument(
+        "--subcommands",
+        nargs="+",
+        default=["print-latest-versions", "print-active-image-names"],
+        help="Subcommands to benchmark. Default: print-latest-versions print-active-image-names",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Measure startup time: a tiny organization, no latency, 20 runs of every quick subcommand plus a bare-interpreter baseline.",
+    )
+    parser.add_argument(
+        "extra_args",
+        nargs=argparse.REMAINDER,
+        help="Arguments passed to every subcommand, after '--'.",
+    )
+    return parser
+
+
+def main():
+    """Start the fake DockerHub, run the benchmarks, print JSON results."""
+    args = get_parser().parse_args()
+    extra_args = [x for x in args.extra_args if x != "--"]
+    if args.startup:
+        args.iterations = max(args.iterations, 20)
+        args.latency_in_seconds = 0.0
+        args.repositories = 1
+        args.tags = 3
+        args.subcommands = ["python"] + STARTUP_SUBCOMMANDS
+
+    # The fake DockerHub runs in its own process, so its memory and CPU are
+    # not charged to the benchmarked runs.
+
+    request_count = multiprocessing.Value("L", 0)
+    endpoint_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(
+        target=serve_fake_dockerhub,
+        args=(
+            (
+                args.repositories,
+                args.tags,
+                args.latency_in_seconds,
+                args.maximum_page_size,
+            ),
+            request_count,
+            endpoint_queue,
+        ),
+        daemon=True,
+    )
+    server_process.start()
+    endpoint = endpoint_queue.get()
+    try:
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            catalog_file = os.path.join(temporary_directory, "catalog.json")
+            write_catalog(catalog_file, args.repositories)
+            for subcommand in args.subcommands:
+                result = benchmark(
+                    endpoint,
+                    request_count,
+                    subcommand,
+                    args.iterations,
+                    extra_args,
+                    catalog_file,
+                )
+                result["latency_in_seconds"] = args.latency_in_seconds
+                result["maximum_page_size"] = args.maximum_page_size
+                result["repositories"] = args.repositories
+                result["tags"] = args.tags
+                print(json.dumps(result, sort_keys=True), flush=True)
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,19 +9,34 @@
 # Import from standard library. https://docs.python.org/3/library/
 
 import argparse
+import base64
+import collections
+import contextlib
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
 import json
 import linecache
 import logging
 import os
+import random
+import re
 import signal
 import sys
+import threading
 import time
+import urllib.parse
+import zlib
 from datetime import date
 
-import requests
-from packaging.version import Version
-
 # Import from https://pypi.org/
+#   "requests" and "packaging" are imported where they are used, as are
+#   "concurrent.futures", "cProfile", "pstats", "http.server" and "sqlite3".
+#   Subcommands that do not touch DockerHub start without loading them.
+#   "yaml" (PyYAML) is optional.  It is only needed for YAML catalog files.
 
 
 # Metadata
@@ -29,7 +44,7 @@ from packaging.version import Version
 __all__: list[str] = []
 __version__ = "1.2.5"  # See https://www.python.org/dev/peps/pep-0396/
 __date__ = "2021-02-22"
-__updated__ = "2024-01-16"
+__updated__ = "2026-10-18"
 
 SENZING_PRODUCT_ID = "5018"  # See https://github.com/Senzing/knowledge-base/blob/main/lists/senzing-product-ids.md
 LOG_FORMAT = "%(asctime)s %(message)s"
@@ -44,41 +59,212 @@ GIGABYTES = 1024 * MEGABYTES
 # 1) Command line options, 2) Environment variables, 3) Configuration files, 4) Default values
 
 CONFIGURATION_LOCATOR = {
+    "batch_jobs": {
+        "default": None,
+        "env": "SENZING_BATCH_JOBS",
+        "cli": "batch-jobs",
+    },
+    "cache_dir": {
+        "default": None,
+        "env": "SENZING_CACHE_DIR",
+        "cli": "cache-dir",
+    },
+    "cache_max_size_in_megabytes": {
+        "default": 100,
+        "env": "SENZING_CACHE_MAX_SIZE_IN_MEGABYTES",
+        "cli": "cache-max-size-in-megabytes",
+    },
+    "cache_ttl_in_seconds": {
+        "default": 300,
+        "env": "SENZING_CACHE_TTL_IN_SECONDS",
+        "cli": "cache-ttl-in-seconds",
+    },
+    "cassette_file": {
+        "default": None,
+        "env": "SENZING_CASSETTE_FILE",
+        "cli": "cassette-file",
+    },
+    "cassette_latency_scale": {
+        "default": 0.0,
+        "env": "SENZING_CASSETTE_LATENCY_SCALE",
+        "cli": "cassette-latency-scale",
+    },
+    "cassette_mode": {
+        "default": "replay",
+        "env": "SENZING_CASSETTE_MODE",
+        "cli": "cassette-mode",
+    },
+    "catalog_file": {
+        "default": None,
+        "env": "SENZING_CATALOG_FILE",
+        "cli": "catalog-file",
+    },
     "debug": {"default": False, "env": "SENZING_DEBUG", "cli": "debug"},
+    "digests": {"default": False, "env": "SENZING_DIGESTS", "cli": "digests"},
     "dockerhub_api_endpoint_v2": {
         "default": "https://hub.docker.com/v2",
         "env": "SENZING_DOCKERHUB_API_ENDPOINT_V2",
         "cli": "dockerhub-api-endpoint-v2",
     },
+    "dockerhub_backoff_in_seconds": {
+        "default": 1,
+        "env": "SENZING_DOCKERHUB_BACKOFF_IN_SECONDS",
+        "cli": "dockerhub-backoff-in-seconds",
+    },
+    "dockerhub_max_retries": {
+        "default": 5,
+        "env": "SENZING_DOCKERHUB_MAX_RETRIES",
+        "cli": "dockerhub-max-retries",
+    },
     "dockerhub_organization": {
         "default": "senzing",
         "env": "SENZING_DOCKERHUB_ORGANIZATION",
         "cli": "dockerhub-organization",
     },
+    "dockerhub_organizations": {
+        "default": None,
+        "env": "SENZING_DOCKERHUB_ORGANIZATIONS",
+        "cli": "dockerhub-organizations",
+    },
     "dockerhub_password": {
         "default": None,
         "env": "SENZING_DOCKERHUB_PASSWORD",
         "cli": "dockerhub-password",
     },
+    "dockerhub_page_size": {
+        "default": 100,
+        "env": "SENZING_DOCKERHUB_PAGE_SIZE",
+        "cli": "dockerhub-page-size",
+    },
+    "dockerhub_pool_size": {
+        "default": 10,
+        "env": "SENZING_DOCKERHUB_POOL_SIZE",
+        "cli": "dockerhub-pool-size",
+    },
+    "dockerhub_timeout_in_seconds": {
+        "default": 30,
+        "env": "SENZING_DOCKERHUB_TIMEOUT_IN_SECONDS",
+        "cli": "dockerhub-timeout-in-seconds",
+    },
+    "dockerhub_token_file": {
+        "default": None,
+        "env": "SENZING_DOCKERHUB_TOKEN_FILE",
+        "cli": "dockerhub-token-file",
+    },
     "dockerhub_username": {
         "default": None,
         "env": "SENZING_DOCKERHUB_USERNAME",
         "cli": "dockerhub-username",
     },
+    "dockerhub_workers": {
+        "default": 8,
+        "env": "SENZING_DOCKERHUB_WORKERS",
+        "cli": "dockerhub-workers",
+    },
+    "full_sync": {
+        "default": False,
+        "env": "SENZING_FULL_SYNC",
+        "cli": "full-sync",
+    },
+    "index_file": {
+        "default": None,
+        "env": "SENZING_INDEX_FILE",
+        "cli": "index-file",
+    },
+    "metrics_file": {
+        "default": None,
+        "env": "SENZING_METRICS_FILE",
+        "cli": "metrics-file",
+    },
+    "output_format": {
+        "default": "shell",
+        "env": "SENZING_OUTPUT_FORMAT",
+        "cli": "output-format",
+    },
+    "output_file": {
+        "default": None,
+        "env": "SENZING_OUTPUT_FILE",
+        "cli": "output-file",
+    },
     "print_format": {
         "default": "{0}",
         "env": "SENZING_PRINT_FORMAT",
         "cli": "print-format",
     },
+    "profile": {
+        "default": None,
+        "env": "SENZING_PROFILE",
+        "cli": "profile",
+    },
+    "refresh_interval_in_seconds": {
+        "default": 3600,
+        "env": "SENZING_REFRESH_INTERVAL_IN_SECONDS",
+        "cli": "refresh-interval-in-seconds",
+    },
+    "registry_pool_size": {
+        "default": 4,
+        "env": "SENZING_REGISTRY_POOL_SIZE",
+        "cli": "registry-pool-size",
+    },
+    "registry_timeout_in_seconds": {
+        "default": 30,
+        "env": "SENZING_REGISTRY_TIMEOUT_IN_SECONDS",
+        "cli": "registry-timeout-in-seconds",
+    },
+    "revalidate_digests": {
+        "default": False,
+        "env": "SENZING_REVALIDATE_DIGESTS",
+        "cli": "revalidate-digests",
+    },
+    "serve_host": {
+        "default": "127.0.0.1",
+        "env": "SENZING_SERVE_HOST",
+        "cli": "serve-host",
+    },
+    "serve_port": {
+        "default": 8080,
+        "env": "SENZING_SERVE_PORT",
+        "cli": "serve-port",
+    },
+    "shard": {
+        "default": None,
+        "env": "SENZING_SHARD",
+        "cli": "shard",
+    },
+    "shard_files": {
+        "default": None,
+        "env": "SENZING_SHARD_FILES",
+        "cli": "shard-files",
+    },
     "sleep_time_in_seconds": {
         "default": 0,
         "env": "SENZING_SLEEP_TIME_IN_SECONDS",
         "cli": "sleep-time-in-seconds",
     },
+    "sort_window": {
+        "default": 0,
+        "env": "SENZING_SORT_WINDOW",
+        "cli": "sort-window",
+    },
+    "state_file": {
+        "default": None,
+        "env": "SENZING_STATE_FILE",
+        "cli": "state-file",
+    },
     "subcommand": {
         "default": None,
         "env": "SENZING_SUBCOMMAND",
     },
+    "watch_max_interval_in_seconds": {
+        "default": 3600,
+        "env": "SENZING_WATCH_MAX_INTERVAL_IN_SECONDS",
+        "cli": "watch-max-interval-in-seconds",
+    },
+    "watch_min_interval_in_seconds": {
+        "default": 60,
+        "env": "SENZING_WATCH_MIN_INTERVAL_IN_SECONDS",
+        "cli": "watch-min-interval-in-seconds",
+    },
 }
 
 # Enumerate keys in 'configuration_locator' that should not be printed to the log.
@@ -87,6 +273,35 @@ KEYS_TO_REDACT = [
     "dockerhub_password",
 ]
 
+CASSETTE_MODES = ["record", "replay"]
+OUTPUT_FORMATS = ["json", "ndjson", "shell"]
+REPORTS = ["print-active-image-names", "print-image-names", "print-latest-versions"]
+
+# Media types of manifests whose digest pins an image.  Listed first are
+# multi-platform indexes, so the pin covers every platform.
+
+MANIFEST_MEDIA_TYPES = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+]
+
+# Compact records of DockerHub results.  Only the fields that are used are kept.
+
+RepositoryRecord = collections.namedtuple(
+    "RepositoryRecord", ["namespace", "name", "last_updated"]
+)
+TagRecord = collections.namedtuple("TagRecord", ["name", "last_updated", "digest"])
+RECORD_TYPES = {x.__name__: x for x in [RepositoryRecord, TagRecord]}
+
+# Tags that are not PEP 440 versions: "{version}-{suffix}[-r{revision}]".
+
+TAG_PATTERN = re.compile(
+    r"^(?P<version>v?\d+(?:\.\d+)*)-(?P<suffix>.+?)(?:-r(?P<revision>\d+))?$"
+)
+ParsedTag = collections.namedtuple("ParsedTag", ["version", "suffix", "revision"])
+
 REDACT_VERSIONS = ["experimental", "latest", "sha256-", "staging", "test"]
 
 # Docker registries for knowledge-base/lists/docker-versions-latest.sh
@@ -236,6 +451,7 @@ DOCKERHUB_REPOSITORIES_FOR_LATEST = {
     "x-mssql": {
         "environment_variable": "SENZING_DOCKER_IMAGE_VERSION_MSSQL_SERVER",
         "image": "mcr.microsoft.com/mssql/server",
+        "policy": {"pattern": r"(\d+)-CU(\d+)(?:-GDR(\d+))?-ubuntu-22\.04"},
         "url-versions": "https://mcr.microsoft.com/v2/mssql/server/tags/list",
         "version": "latest",
     },
@@ -325,20 +541,108 @@ def get_parser():
     """Parse commandline arguments."""
 
     subcommands = {
+        "batch": {
+            "help": "Write several reports in one process, sharing one DockerHub client and cache.",
+            "argument_aspects": [
+                "catalog",
+                "common",
+                "dockerhub",
+                "index",
+                "organizations",
+                "print",
+                "state",
+            ],
+            "arguments": {
+                "--batch-jobs": {
+                    "dest": "batch_jobs",
+                    "metavar": "SENZING_BATCH_JOBS",
+                    "nargs": "+",
+                    "help": "Jobs as 'subcommand=output-file', e.g. 'print-image-names=names.json'. '-' is stdout. Default: none",
+                },
+            },
+        },
+        "merge-latest-versions": {
+            "help": "Merge print-latest-versions outputs of every shard into one script.",
+            "argument_aspects": ["common"],
+            "arguments": {
+                "--shard-files": {
+                    "dest": "shard_files",
+                    "metavar": "SENZING_SHARD_FILES",
+                    "nargs": "+",
+                    "help": "Outputs of 'print-latest-versions --shard'. Default: none",
+                },
+            },
+        },
         "print-active-image-names": {
             "help": "Print image names hosted on DockerHub.",
-            "argument_aspects": ["common", "print"],
+            "argument_aspects": ["common", "dockerhub", "organizations", "print"],
             "arguments": {},
         },
         "print-image-names": {
             "help": "Print image names used in Senzing demonstrations.",
-            "argument_aspects": ["common"],
+            "argument_aspects": ["catalog", "common"],
             "arguments": {},
         },
         "print-latest-versions": {
             "help": "Print latest versions of Docker images.",
-            "argument_aspects": ["common"],
-            "arguments": {},
+            "argument_aspects": [
+                "catalog",
+                "common",
+                "digests",
+                "dockerhub",
+                "index",
+                "state",
+            ],
+            "arguments": {
+                "--output-format": {
+                    "dest": "output_format",
+                    "metavar": "SENZING_OUTPUT_FORMAT",
+                    "help": "'shell' for a bash script; 'ndjson' or 'json' for a record per image as it resolves. Default: shell",
+                },
+                "--revalidate-digests": {
+                    "dest": "revalidate_digests",
+                    "action": "store_true",
+                    "help": "Look digests up again instead of using SENZING_CACHE_DIR. (SENZING_REVALIDATE_DIGESTS) Default: False",
+                },
+                "--shard": {
+                    "dest": "shard",
+                    "metavar": "SENZING_SHARD",
+                    "help": "Resolve only shard 'i' of 'n' of the catalog, e.g. '1/4'. Default: none (all)",
+                },
+                "--sort-window": {
+                    "dest": "sort_window",
+                    "metavar": "SENZING_SORT_WINDOW",
+                    "help": "Emit 'ndjson' or 'json' records sorted, resolving at most this many ahead. Default: 0 (as resolved)",
+                },
+            },
+        },
+        "serve": {
+            "help": "Serve reports over HTTP from a periodically refreshed snapshot.",
+            "argument_aspects": [
+                "catalog",
+                "common",
+                "dockerhub",
+                "organizations",
+                "print",
+                "state",
+            ],
+            "arguments": {
+                "--refresh-interval-in-seconds": {
+                    "dest": "refresh_interval_in_seconds",
+                    "metavar": "SENZING_REFRESH_INTERVAL_IN_SECONDS",
+                    "help": "Time between snapshot refreshes. Default: 3600",
+                },
+                "--serve-host": {
+                    "dest": "serve_host",
+                    "metavar": "SENZING_SERVE_HOST",
+                    "help": "Interface to listen on. Default: 127.0.0.1",
+                },
+                "--serve-port": {
+                    "dest": "serve_port",
+                    "metavar": "SENZING_SERVE_PORT",
+                    "help": "Port to listen on. Default: 8080",
+                },
+            },
         },
         "sleep": {
             "help": "Do nothing but sleep. For Docker testing.",
@@ -356,11 +660,50 @@ def get_parser():
         "docker-acceptance-test": {
             "help": "For Docker acceptance testing.",
         },
+        "sync-index": {
+            "help": "Mirror the tags of every catalog repository into a local SQLite index.",
+            "argument_aspects": ["catalog", "common", "dockerhub", "index"],
+            "arguments": {
+                "--full-sync": {
+                    "dest": "full_sync",
+                    "action": "store_true",
+                    "help": "List every tag again and delete indexed tags no longer on DockerHub. (SENZING_FULL_SYNC) Default: False",
+                },
+            },
+        },
+        "watch": {
+            "help": "Poll the catalog and print an NDJSON event whenever a version changes.",
+            "argument_aspects": ["catalog", "common", "digests", "dockerhub"],
+            "arguments": {
+                "--output-file": {
+                    "dest": "output_file",
+                    "metavar": "SENZING_OUTPUT_FILE",
+                    "help": "Append events to this file instead of printing them. Default: none (stdout)",
+                },
+                "--watch-max-interval-in-seconds": {
+                    "dest": "watch_max_interval_in_seconds",
+                    "metavar": "SENZING_WATCH_MAX_INTERVAL_IN_SECONDS",
+                    "help": "Longest time between polls of an image that does not change. Default: 3600",
+                },
+                "--watch-min-interval-in-seconds": {
+                    "dest": "watch_min_interval_in_seconds",
+                    "metavar": "SENZING_WATCH_MIN_INTERVAL_IN_SECONDS",
+                    "help": "Time between polls of an image that just changed. Default: 60",
+                },
+            },
+        },
     }
 
     # Define argument_aspects.
 
     argument_aspects = {
+        "catalog": {
+            "--catalog-file": {
+                "dest": "catalog_file",
+                "metavar": "SENZING_CATALOG_FILE",
+                "help": "JSON or YAML file of Docker images to report on. Default: built-in catalog",
+            },
+        },
         "common": {
             "--debug": {
                 "dest": "debug",
@@ -372,6 +715,120 @@ def get_parser():
                 "metavar": "SENZING_DOCKERHUB_API_ENDPOINT_V2",
                 "help": "Dockerhub API endpoint Version 2",
             },
+            "--profile": {
+                "dest": "profile",
+                "metavar": "SENZING_PROFILE",
+                "help": "Write cProfile statistics of the subcommand to this file. Default: none",
+            },
+        },
+        "digests": {
+            "--digests": {
+                "dest": "digests",
+                "action": "store_true",
+                "help": "Pin every version to its manifest digest, 'version@sha256:...'. 'watch' also reports a tag pushed again with a new digest. (SENZING_DIGESTS) Default: False",
+            },
+        },
+        "dockerhub": {
+            "--cache-dir": {
+                "dest": "cache_dir",
+                "metavar": "SENZING_CACHE_DIR",
+                "help": "Directory for cached DockerHub responses. Default: none (no caching)",
+            },
+            "--cache-max-size-in-megabytes": {
+                "dest": "cache_max_size_in_megabytes",
+                "metavar": "SENZING_CACHE_MAX_SIZE_IN_MEGABYTES",
+                "help": "Size of cache before least-recently-used eviction. Default: 100",
+            },
+            "--cache-ttl-in-seconds": {
+                "dest": "cache_ttl_in_seconds",
+                "metavar": "SENZING_CACHE_TTL_IN_SECONDS",
+                "help": "Age before a cached response is revalidated. Default: 300",
+            },
+            "--cassette-file": {
+                "dest": "cassette_file",
+                "metavar": "SENZING_CASSETTE_FILE",
+                "help": "Gzipped JSON-lines file of recorded HTTP responses. Default: none (use the network)",
+            },
+            "--cassette-latency-scale": {
+                "dest": "cassette_latency_scale",
+                "metavar": "SENZING_CASSETTE_LATENCY_SCALE",
+                "help": "Replayed responses wait their recorded latency times this factor. Default: 0.0 (no wait)",
+            },
+            "--cassette-mode": {
+                "dest": "cassette_mode",
+                "metavar": "SENZING_CASSETTE_MODE",
+                "help": "'record' responses from the network, or 'replay' them without it. Default: replay",
+            },
+            "--dockerhub-backoff-in-seconds": {
+                "dest": "dockerhub_backoff_in_seconds",
+                "metavar": "SENZING_DOCKERHUB_BACKOFF_IN_SECONDS",
+                "help": "Base delay of exponential backoff between retries. Default: 1",
+            },
+            "--dockerhub-max-retries": {
+                "dest": "dockerhub_max_retries",
+                "metavar": "SENZING_DOCKERHUB_MAX_RETRIES",
+                "help": "Retries of throttled (429), failed (5xx), timed out or unconnected requests. Default: 5",
+            },
+            "--dockerhub-page-size": {
+                "dest": "dockerhub_page_size",
+                "metavar": "SENZING_DOCKERHUB_PAGE_SIZE",
+                "help": "Number of results per DockerHub page. Default: 100",
+            },
+            "--dockerhub-pool-size": {
+                "dest": "dockerhub_pool_size",
+                "metavar": "SENZING_DOCKERHUB_POOL_SIZE",
+                "help": "Threads prefetching DockerHub pages. Up to SENZING_DOCKERHUB_POOL_SIZE + SENZING_DOCKERHUB_WORKERS connections are pooled. Default: 10",
+            },
+            "--dockerhub-timeout-in-seconds": {
+                "dest": "dockerhub_timeout_in_seconds",
+                "metavar": "SENZING_DOCKERHUB_TIMEOUT_IN_SECONDS",
+                "help": "Time to wait for DockerHub to connect or respond before retrying. Default: 30",
+            },
+            "--dockerhub-token-file": {
+                "dest": "dockerhub_token_file",
+                "metavar": "SENZING_DOCKERHUB_TOKEN_FILE",
+                "help": "File caching the DockerHub login token across runs. Default: 'dockerhub-token.json' in SENZING_CACHE_DIR, if set",
+            },
+            "--dockerhub-username": {
+                "dest": "dockerhub_username",
+                "metavar": "SENZING_DOCKERHUB_USERNAME",
+                "help": "Log in to DockerHub as this user, with SENZING_DOCKERHUB_PASSWORD, for its higher rate limit. Default: none (anonymous)",
+            },
+            "--dockerhub-workers": {
+                "dest": "dockerhub_workers",
+                "metavar": "SENZING_DOCKERHUB_WORKERS",
+                "help": "Maximum number of concurrent DockerHub requests. Default: 8",
+            },
+            "--metrics-file": {
+                "dest": "metrics_file",
+                "metavar": "SENZING_METRICS_FILE",
+                "help": "File for Prometheus-format metrics of DockerHub calls. Default: none",
+            },
+            "--registry-pool-size": {
+                "dest": "registry_pool_size",
+                "metavar": "SENZING_REGISTRY_POOL_SIZE",
+                "help": "Pooled connections and concurrent requests per third-party registry host. Default: 4",
+            },
+            "--registry-timeout-in-seconds": {
+                "dest": "registry_timeout_in_seconds",
+                "metavar": "SENZING_REGISTRY_TIMEOUT_IN_SECONDS",
+                "help": "Time to wait for a third-party registry before using the pinned version. Default: 30",
+            },
+        },
+        "index": {
+            "--index-file": {
+                "dest": "index_file",
+                "metavar": "SENZING_INDEX_FILE",
+                "help": "SQLite index of tags, filled by 'sync-index'. Default: none",
+            },
+        },
+        "organizations": {
+            "--dockerhub-organizations": {
+                "dest": "dockerhub_organizations",
+                "metavar": "SENZING_DOCKERHUB_ORGANIZATIONS",
+                "nargs": "+",
+                "help": "Organizations whose images are listed. Default: SENZING_DOCKERHUB_ORGANIZATION",
+            },
         },
         "print": {
             "--print-format": {
@@ -380,6 +837,13 @@ def get_parser():
                 "help": "Format of output. Default: '{0}'",
             },
         },
+        "state": {
+            "--state-file": {
+                "dest": "state_file",
+                "metavar": "SENZING_STATE_FILE",
+                "help": "File of versions from the previous run or refresh. Only changed repositories are queried. Default: none",
+            },
+        },
     }
 
     # Augment "subcommands" variable with arguments specified by aspects.
@@ -428,6 +892,12 @@ MESSAGE_DEBUG = 900
 
 MESSAGE_DICTIONARY = {
     "100": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}I",
+    "160": "Snapshot refreshed.",
+    "161": "Serving reports on http://{0}:{1}",
+    "162": "Indexed {0} new or updated tags of {1}/{2}.",
+    "163": "Synced {0} repositories into {1}.",
+    "164": "Watching {0} images.",
+    "165": "Deleted {0} tags of {1}/{2} no longer on DockerHub.",
     "292": "Configuration change detected.  Old: {0} New: {1}",
     "293": "For information on warnings and errors, see https://github.com/Senzing/dockerhub-util",
     "294": "Version: {0}  Updated: {1}",
@@ -438,15 +908,39 @@ MESSAGE_DICTIONARY = {
     "299": "{0}",
     "300": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}W",
     "499": "{0}",
+    "301": "Ignoring unreadable state file {0}. Error: {1}",
+    "302": "DockerHub returned HTTP {0} for {1}. Retrying in {2:.2f} seconds.",
+    "303": "Registry returned HTTP {0} for {1}. Retrying in {2:.2f} seconds.",
+    "304": "Could not resolve {0} from {1}. Using pinned version: {2}. Error: {3}",
+    "305": "In repository '{0}', no tag matches policy {1}",
+    "306": "Could not resolve the digest of {0}. Leaving it unpinned. Error: {1}",
+    "307": "Repository {0}/{1} not found. Not indexed.",
+    "308": "DockerHub login of {0} failed. Continuing anonymously. Error: {1}",
+    "309": "Polling {0} failed. Retrying in {1} seconds. Error: {2}",
+    "310": "DockerHub request for {0} failed. Retrying in {1:.2f} seconds. Error: {2}",
     "500": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}E",
     "696": "Bad SENZING_SUBCOMMAND: {0}.",
     "697": "No processing done.",
     "698": "Program terminated with error.",
     "699": "{0}",
     "700": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}E",
+    "702": "DockerHub request failed. Error: {0}",
+    "703": "Snapshot refresh failed. Keeping previous snapshot. Error: {0}",
+    "704": "Cannot read catalog file {0}. Error: {1}",
+    "705": "Reading YAML catalog file {0} requires PyYAML. Install with: pip install PyYAML",
+    "706": "Bad SENZING_SHARD: {0}. Expected 'i/n' with 1 <= i <= n, e.g. '1/4'.",
+    "707": "Incomplete shard files. Expected shards 1/{0} to {0}/{0}. Found: {1}",
+    "708": "Conflicting versions for {0}: {1} and {2}",
+    "709": "Bad SENZING_OUTPUT_FORMAT: {0}. Expected one of: {1}",
+    "710": "sync-index requires SENZING_INDEX_FILE.",
+    "711": "Bad SENZING_CASSETTE_MODE: {0}. Expected one of: {1}",
+    "712": "Bad SENZING_BATCH_JOBS entry: {0}. Expected 'subcommand=output-file' with a subcommand of: {1}",
+    "713": "batch requires SENZING_BATCH_JOBS.",
+    "714": "Bad policy of catalog entry '{0}' in {1}. Error: {2}",
     "899": "{0}",
     "900": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}D",
     "901": "In repository '{0}', Non-semantic-version {1}",
+    "903": "In repository '{0}', tag policy answers: {1}",
     "998": "Debugging enabled.",
     "999": "{0}",
 }
@@ -513,6 +1007,7 @@ def get_exception():
 
 def get_configuration(subcommand, args):
     """Order of precedence: CLI, OS environment variables, INI file, default."""
+    start_time = time.perf_counter()
     result = {}
 
     # Copy default values into configuration dictionary.
@@ -557,6 +1052,9 @@ def get_configuration(subcommand, args):
 
     booleans = [
         "debug",
+        "digests",
+        "full_sync",
+        "revalidate_digests",
     ]
     for boolean in booleans:
         boolean_value = result.get(boolean)
@@ -569,12 +1067,52 @@ def get_configuration(subcommand, args):
 
     # Special case: Change integer strings to integers.
 
-    integers = ["sleep_time_in_seconds"]
+    integers = [
+        "cache_max_size_in_megabytes",
+        "cache_ttl_in_seconds",
+        "dockerhub_backoff_in_seconds",
+        "dockerhub_max_retries",
+        "dockerhub_page_size",
+        "dockerhub_pool_size",
+        "dockerhub_timeout_in_seconds",
+        "dockerhub_workers",
+        "refresh_interval_in_seconds",
+        "registry_pool_size",
+        "registry_timeout_in_seconds",
+        "serve_port",
+        "sleep_time_in_seconds",
+        "sort_window",
+        "watch_max_interval_in_seconds",
+        "watch_min_interval_in_seconds",
+    ]
     for integer in integers:
         integer_string = result.get(integer)
         if integer_string is not None:
             result[integer] = int(integer_string)
 
+    # Special case: Change float strings to floats.
+
+    floats = [
+        "cassette_latency_scale",
+    ]
+    for float_key in floats:
+        float_string = result.get(float_key)
+        if float_string is not None:
+            result[float_key] = float(float_string)
+
+    # Special case: Change comma-separated strings to lists.
+
+    lists = [
+        "batch_jobs",
+        "dockerhub_organizations",
+        "shard_files",
+    ]
+    for list_key in lists:
+        list_string = result.get(list_key)
+        if isinstance(list_string, str):
+            result[list_key] = [x.strip() for x in list_string.split(",") if x.strip()]
+
+    METRICS.add_phase("configuration", time.perf_counter() - start_time)
     return result
 
 
@@ -592,6 +1130,42 @@ def validate_configuration(config):
         if not config.get("github_access_token"):
             user_error_messages.append(message_error(701))
 
+    if config.get("cassette_file"):
+        if config.get("cassette_mode") not in CASSETTE_MODES:
+            user_error_messages.append(
+                message_error(
+                    711, config.get("cassette_mode"), ", ".join(CASSETTE_MODES)
+                )
+            )
+
+    if subcommand in ["sync-index"]:
+        if not config.get("index_file"):
+            user_error_messages.append(message_error(710))
+
+    if subcommand in ["batch"]:
+        if not config.get("batch_jobs"):
+            user_error_messages.append(message_error(713))
+        for batch_job in config.get("batch_jobs") or []:
+            try:
+                parse_batch_job(batch_job)
+            except ValueError:
+                user_error_messages.append(
+                    message_error(712, batch_job, ", ".join(REPORTS))
+                )
+
+    if subcommand in ["print-latest-versions"]:
+        if config.get("shard"):
+            try:
+                parse_shard(config.get("shard"))
+            except ValueError:
+                user_error_messages.append(message_error(706, config.get("shard")))
+        if config.get("output_format") not in OUTPUT_FORMATS:
+            user_error_messages.append(
+                message_error(
+                    709, config.get("output_format"), ", ".join(OUTPUT_FORMATS)
+                )
+            )
+
     # Log warning messages.
 
     for user_warning_message in user_warning_messages:
@@ -625,221 +1199,2871 @@ def redact_configuration(config):
 
 
 # -----------------------------------------------------------------------------
-# Class DockerHubClient
-# Inspired by https://github.com/amalfra/docker-hub/blob/master/src/libs/docker_hub_client.py
+# Class Metrics
 # -----------------------------------------------------------------------------
 
 
-class DockerHubClient:
-    """Wrapper to communicate with docker hub API"""
+class Metrics:
+    """Thread-safe counters and histograms, rendered in Prometheus text format."""
 
-    def __init__(self, config):
-        self.auth_token = config.get("auth_token")
-        self.dockerhub_api_endpoint_v2 = config.get("dockerhub_api_endpoint_v2")
-        self.valid_methods = ["GET", "POST"]
+    BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
 
-    def do_request(self, url, method="GET", data=None):
-        """Make an HTTP request."""
-        result = {}
-        if not data:
-            data = {}
-        if method not in self.valid_methods:
-            raise ValueError("Invalid HTTP request method")
-        headers = {"Content-type": "application/json"}
-        if self.auth_token:
-            headers["Authorization"] = "JWT " + self.auth_token
-        request_method = getattr(requests, method.lower())
-        if len(data) > 0:
-            data = json.dumps(data, indent=2, sort_keys=True)
-            response = request_method(url, data, headers=headers)
-        else:
-            response = request_method(url, headers=headers)
-        if response.status_code == 200:
-            result = json.loads(response.content.decode())
-        return result
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        self.counters = {}
+        self.histograms = {}
 
-    def get_repositories(self, organization):
-        """Return a list of repositories."""
-        url = "{0}/repositories/{1}/?page_size=200".format(
-            self.dockerhub_api_endpoint_v2, organization
-        )
-        return self.do_request(url)
+    def describe(self, name, metric_type, description):
+        """Register the TYPE and HELP lines of a metric."""
+        self.descriptions[name] = (metric_type, description)
+
+    def increment(self, name, labels=None, value=1):
+        """Add "value" to a counter."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
 
-    def get_repository_tags(self, organization, repository_name):
-        """Return a list repository tags for a repository."""
-        url = "{0}/repositories/{1}/{2}/tags".format(
-            self.dockerhub_api_endpoint_v2, organization, repository_name
+    def add_phase(self, phase, seconds):
+        """Add time spent in a phase of the run."""
+        self.increment("dockerhub_util_phase_seconds_total", {"phase": phase}, seconds)
+
+    @contextlib.contextmanager
+    def phase(self, phase, clock=time.perf_counter):
+        """Context manager timing a phase of the run with "clock"."""
+        start_time = clock()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, clock() - start_time)
+
+    def phase_times(self):
+        """Return seconds spent per phase, summed over threads."""
+        with self.lock:
+            return {
+                dict(labels).get("phase"): round(value, 6)
+                for (name, labels), value in self.counters.items()
+                if name == "dockerhub_util_phase_seconds_total"
+            }
+
+    def observe(self, name, value, labels=None):
+        """Record one observation in a histogram."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key, {"buckets": [0] * len(self.BUCKETS), "count": 0, "sum": 0.0}
+            )
+            for index, bucket in enumerate(self.BUCKETS):
+                if value <= bucket:
+                    histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    @staticmethod
+    def format_labels(labels):
+        """Return Prometheus label syntax for a tuple of (name, value) pairs."""
+        if not labels:
+            return ""
+        return "{{{0}}}".format(
+            ",".join(
+                '{0}="{1}"'.format(
+                    name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                )
+                for name, value in labels
+            )
         )
-        return self.do_request(url)
 
+    def render(self):
+        """Return every metric in Prometheus text exposition format."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: {
+                    "buckets": list(value["buckets"]),
+                    "count": value["count"],
+                    "sum": value["sum"],
+                }
+                for key, value in self.histograms.items()
+            }
+        lines = []
+        for name in sorted({key[0] for key in list(counters) + list(histograms)}):
+            metric_type, description = self.descriptions.get(name, ("untyped", name))
+            lines.append("# HELP {0} {1}".format(name, description))
+            lines.append("# TYPE {0} {1}".format(name, metric_type))
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(
+                        "{0}{1} {2}".format(name, self.format_labels(labels), value)
+                    )
+            for (histogram_name, labels), value in sorted(histograms.items()):
+                if histogram_name != name:
+                    continue
+                for bucket, count in zip(
+                    self.BUCKETS + ["+Inf"], value["buckets"] + [value["count"]]
+                ):
+                    lines.append(
+                        "{0}_bucket{1} {2}".format(
+                            name, self.format_labels(labels + (("le", bucket),)), count
+                        )
+                    )
+                lines.append(
+                    "{0}_sum{1} {2}".format(
+                        name, self.format_labels(labels), value["sum"]
+                    )
+                )
+                lines.append(
+                    "{0}_count{1} {2}".format(
+                        name, self.format_labels(labels), value["count"]
+                    )
+                )
+        return "".join(line + "\n" for line in lines)
+
+
+METRICS = Metrics()
+METRICS.describe(
+    "dockerhub_util_requests_total",
+    "counter",
+    "HTTP requests sent to DockerHub and third-party registries, by registry host, endpoint and status code.",
+)
+METRICS.describe(
+    "dockerhub_util_request_duration_seconds",
+    "histogram",
+    "Latency of HTTP requests sent to DockerHub and third-party registries, by registry host, endpoint and status code.",
+)
+METRICS.describe(
+    "dockerhub_util_cache_requests_total",
+    "counter",
+    "Response cache lookups, by result: hit, not_modified or miss.",
+)
+METRICS.describe(
+    "dockerhub_util_phase_seconds_total",
+    "counter",
+    "Time spent per phase of the run: configuration, network_wait, json_decode, version_ranking and output_rendering.",
+)
+METRICS.describe(
+    "dockerhub_util_repository_resolution_seconds",
+    "histogram",
+    "Time to resolve the latest version of a repository.",
+)
 
 # -----------------------------------------------------------------------------
-# Utility functions
+# Class ThreadProfiler
 # -----------------------------------------------------------------------------
 
 
-def create_signal_handler_function(args):
-    """Tricky code.  Uses currying technique. Create a function for signal handling.
-    that knows about "args".
+class ThreadProfiler:
+    """cProfile statistics of the main thread and of every worker thread.
+
+    cProfile only sees the thread that enables it.  Worker threads call
+    start_thread() when they start, e.g. as an executor "initializer", and
+    get their own profiler.  dump_stats() merges all of them.
     """
 
-    def result_function(signal_number, frame):
-        logging.info(message_info(298, args))
-        logging.debug(message_debug(901, signal_number, frame))
-        sys.exit(0)
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profilers = []
+        self.enabled = False
+
+    def start_thread(self):
+        """Profile the calling thread, if profiling is on."""
+        import cProfile  # pylint: disable=import-outside-toplevel
+
+        if not self.enabled:
+            return
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.profilers.append(profiler)
+        profiler.enable()
+
+    def runcall(self, function, *args):
+        """Call "function" with profiling on in every thread."""
+        self.enabled = True
+        self.start_thread()
+        try:
+            return function(*args)
+        finally:
+            self.profilers[0].disable()
+
+    def dump_stats(self, filename):
+        """Write the merged statistics of every thread to a file."""
+        import pstats  # pylint: disable=import-outside-toplevel
+
+        with self.lock:
+            profilers = list(self.profilers)
+        stats = pstats.Stats(profilers[0])
+        stats.add(*profilers[1:])
+        stats.dump_stats(filename)
+
+
+PROFILER = ThreadProfiler()
+
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/v2/.+/tags/list$"), "/v2/{name}/tags/list"),
+    (re.compile(r"^/v2/.+/manifests/[^/]+$"), "/v2/{name}/manifests/{reference}"),
+    (
+        re.compile(r"/repositories/[^/]+/[^/]+/tags/[^/]+/?$"),
+        "/repositories/{namespace}/{repository}/tags/{tag}",
+    ),
+    (
+        re.compile(r"/repositories/[^/]+/[^/]+/tags/?$"),
+        "/repositories/{namespace}/{repository}/tags",
+    ),
+    (re.compile(r"/repositories/[^/]+/?$"), "/repositories/{namespace}/"),
+]
 
-    return result_function
 
+def compact_result(item):
+    """json object_hook: Replace repositories and tags by compact records.
 
-def bootstrap_signal_handler(signal_number, frame):
-    """Exit on signal error."""
-    logging.debug(message_debug(901, signal_number, frame))
-    sys.exit(0)
+    json calls it for the innermost objects first, so the per-platform
+    "images" of a tag are dropped before the tag becomes a TagRecord.
+    Other objects, like the page around "results", are kept as dicts.
+    """
 
+    if "architecture" in item:
+        return None
+    if "namespace" in item and "name" in item:
+        return RepositoryRecord(
+            item.get("namespace"), item.get("name"), item.get("last_updated")
+        )
+    if "images" in item and "name" in item:
+        return TagRecord(item.get("name"), item.get("last_updated"), item.get("digest"))
+    return item
 
-def entry_template(config):
-    """Format of entry message."""
-    debug = config.get("debug", False)
-    config["start_time"] = time.time()
-    if debug:
-        final_config = config
-    else:
-        final_config = redact_configuration(config)
-    config_json = json.dumps(final_config, sort_keys=True)
-    return message_info(297, config_json)
 
+def parse_results(body):
+    """Decode the bytes of a DockerHub response without a decoded str copy."""
 
-def exit_template(config):
-    """Format of exit message."""
-    debug = config.get("debug", False)
-    stop_time = time.time()
-    config["stop_time"] = stop_time
-    config["elapsed_time"] = stop_time - config.get("start_time", stop_time)
-    if debug:
-        final_config = config
-    else:
-        final_config = redact_configuration(config)
-    config_json = json.dumps(final_config, sort_keys=True)
-    return message_info(298, config_json)
+    with METRICS.phase("json_decode"):
+        return json.loads(body, object_hook=compact_result)
 
 
-def exit_error(index, *args):
-    """Log error message and exit program."""
-    logging.error(message_error(index, *args))
-    logging.error(message_error(698))
-    sys.exit(1)
+def dump_compact(result):
+    """Return (record type name, bytes) of a parsed response, for the cache.
 
+    Records, whether the result itself or the items of its "results", are
+    stored as lists of their fields, so no per-object hook is needed to load
+    them, and the unused fields of DockerHub's response are not stored.
+    """
 
-def exit_silently():
-    """Exit program."""
-    sys.exit(0)
+    record_type = None
+    if isinstance(result, tuple):
+        record_type = type(result).__name__
+    elif isinstance(result, dict) and result.get("results"):
+        if isinstance(result.get("results")[0], tuple):
+            record_type = type(result.get("results")[0]).__name__
+    return record_type, json.dumps(result).encode()
 
 
-# -----------------------------------------------------------------------------
-# Helper functions
-# -----------------------------------------------------------------------------
+def load_compact(record_type, body):
+    """Return the parsed response stored by dump_compact()."""
 
+    with METRICS.phase("json_decode"):
+        result = json.loads(body)
+    if record_type is None:
+        return result
+    record_class = RECORD_TYPES[record_type]
+    if isinstance(result, list):
+        return record_class(*result)
+    result["results"] = [record_class(*x) for x in result.get("results")]
+    return result
 
-def max_version(versions):
-    """Return most recent (highest) version."""
 
-    result = Version("0.0.0")
-    for version in versions:
-        version_parsed = Version(version)
-        result = max(version_parsed, result)
-    return result
+def endpoint_label(url):
+    """Return a low-cardinality label for the endpoint of a URL."""
 
+    path = urllib.parse.urlparse(url).path
+    for pattern, label in ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return label
+    return path
 
-def redacted(key):
-    """Determine if a key is redacted."""
 
-    for redact in REDACT_VERSIONS:
-        if key.startswith(redact):
-            return True
-    return False
+def write_metrics(config):
+    """Write metrics to SENZING_METRICS_FILE, if configured."""
 
+    metrics_file = config.get("metrics_file")
+    if not metrics_file:
+        return
+    temporary_metrics_file = "{0}.{1}".format(metrics_file, os.getpid())
+    with open(temporary_metrics_file, "w", encoding="utf-8") as output_file:
+        output_file.write(METRICS.render())
+    os.replace(temporary_metrics_file, metrics_file)
 
-def find_latest_version(version_list):
-    """Return the latest version after redacting the version_list."""
 
-    # TODO: Perhaps improve with https://pypi.org/project/semver/
-    return max_version([x for x in version_list if not redacted(x)])
+# -----------------------------------------------------------------------------
+# Class ResponseCache
+# -----------------------------------------------------------------------------
 
 
-def get_active_image_names(config):
-    """Get the latest version of Docker images."""
+class ResponseCache:
+    """On-disk cache of HTTP responses keyed by URL.
 
-    result = []
-    organization = config.get("dockerhub_organization")
-    dockerhub_client = DockerHubClient(config)
-    response = dockerhub_client.get_repositories(organization)
-    result = response.get("results", result)
-    return result
+    Each entry is one file: a line of JSON metadata followed by the body in
+    the compact form of dump_compact().  File modification time records last
+    use, for least-recently-used eviction.  Eviction runs whenever a tenth of
+    the maximum size has been written since the last one, so long-lived
+    clients stay within the limit too.
+    """
 
+    def __init__(self, cache_dir, ttl_in_seconds, max_size_in_bytes):
+        self.cache_dir = cache_dir
+        self.ttl_in_seconds = ttl_in_seconds
+        self.max_size_in_bytes = max_size_in_bytes
+        self.lock = threading.Lock()
+        self.written_since_eviction = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, url):
+        """Return the filename of the entry for a URL."""
+        return os.path.join(
+            self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".cache"
+        )
 
-def get_latest_versions(config, dockerhub_repositories):
-    """Get the latest version of Docker images."""
+    def get(self, url):
+        """Return (metadata, body) for a URL, or (None, None) on a miss.
 
-    result = []
-    organization_default = config.get("dockerhub_organization")
-    dockerhub_client = DockerHubClient(config)
-    for key, value in dockerhub_repositories.items():
-        organization = value.get("organization", organization_default)
-        latest_version = value.get("version")
-        if not latest_version:
-            repository_name = value.get("repository", key)
-            response = dockerhub_client.get_repository_tags(
-                organization, repository_name
-            )
-            response_results = response.get("results")
-            if response_results is not None:
-                version_tags = [x.get("name") for x in response_results]
-                try:
-                    latest_version = find_latest_version(version_tags)
-                except Exception as err:
-                    logging.error(message_error(901, repository_name, err))
-                    continue
-            else:
-                print(f"Could not find {key}. Using default: latest", file=sys.stderr)
-                latest_version = "latest"
+        Entries written before bodies were stored compactly are misses.
+        """
+        path = self.path(url)
+        try:
+            with open(path, "rb") as cache_file:
+                metadata = json.loads(cache_file.readline())
+                body = cache_file.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None, None
+        if "record_type" not in metadata:
+            return None, None
+        return metadata, body
+
+    def is_fresh(self, metadata):
+        """Return True if an entry is younger than the TTL."""
+        return time.time() - metadata.get("stored_at", 0) < self.ttl_in_seconds
+
+    def put(self, url, response, record_type, body):
+        """Store the headers of a response with the compact form of its body."""
+        self.write(
+            url,
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "record_type": record_type,
+            },
+            body,
+        )
 
-        result.append(
-            "export {0}={1}".format(value.get("environment_variable"), latest_version)
+    def refresh(self, url, response, metadata, body):
+        """Store an entry again after a 304 response revalidated it.
+
+        A 304 need not repeat the validators, so those it omits are kept.
+        """
+        self.write(
+            url,
+            {
+                "etag": response.headers.get("ETag") or metadata.get("etag"),
+                "last_modified": response.headers.get("Last-Modified")
+                or metadata.get("last_modified"),
+                "record_type": metadata.get("record_type"),
+            },
+            body,
         )
 
-    result.sort()
-    return result
+    def write(self, url, metadata, body):
+        """Atomically write an entry, stamped with the time it was stored."""
+        metadata = dict(metadata, stored_at=time.time(), url=url)
+        path = self.path(url)
+        temporary_path = "{0}.{1}.{2}".format(path, os.getpid(), threading.get_ident())
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(json.dumps(metadata, sort_keys=True).encode() + b"\n")
+            cache_file.write(body)
+        os.replace(temporary_path, path)
+        with self.lock:
+            self.written_since_eviction += len(body)
+            evict = self.written_since_eviction > self.max_size_in_bytes // 10
+            if evict:
+                self.written_since_eviction = 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Remove least-recently-used entries until the cache fits its size."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as directory_entries:
+            for directory_entry in directory_entries:
+                if directory_entry.name.endswith(".cache"):
+                    stat = directory_entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, directory_entry.path))
+                    total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size_in_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
 
 
-def get_image_names(dockerhub_repositories):
-    """Get Docker images names from DockerHub."""
+# -----------------------------------------------------------------------------
+# Class DigestCache
+# -----------------------------------------------------------------------------
 
-    result = {}
-    for key, value in dockerhub_repositories.items():
-        # Skip deprecated keys.
 
-        if "deprecated" in key:
-            continue
+class DigestCache:
+    """Permanent on-disk cache of the manifest digest of "image:tag".
 
-        # Add to result.
+    Each entry is one small file holding the digest.  Entries never expire;
+    they are only replaced when a digest is looked up again.
+    """
 
-        if "image" in value:
-            image_name = value.get("image")
-        else:
-            image_name = "senzing/{0}".format(key)
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
 
-        result[image_name] = {"environment_variable": value.get("environment_variable")}
+    def path(self, reference):
+        """Return the filename of the entry for an "image:tag" reference."""
+        return os.path.join(
+            self.cache_dir, hashlib.sha256(reference.encode()).hexdigest() + ".digest"
+        )
 
-    return result
+    def get(self, reference):
+        """Return the cached digest of a reference, or None."""
+        try:
+            with open(self.path(reference), encoding="utf-8") as cache_file:
+                return cache_file.read().strip() or None
+        except OSError:
+            return None
+
+    def put(self, reference, digest):
+        """Atomically store the digest of a reference, if it changed."""
+        if self.get(reference) == digest:
+            return
+        path = self.path(reference)
+        temporary_path = "{0}.{1}.{2}".format(path, os.getpid(), threading.get_ident())
+        with open(temporary_path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(digest + "\n")
+        os.replace(temporary_path, path)
 
 
 # -----------------------------------------------------------------------------
-# do_* functions
-#   Common function signature: do_XXX(args)
+# Class TagIndex
 # -----------------------------------------------------------------------------
 
 
-def do_docker_acceptance_test(subcommand, args):
+class TagIndex:
+    """SQLite index of the tags of DockerHub repositories.
+
+    "tags" mirrors the name, last_updated and digest of every tag.
+    "repositories" records when a repository was last synced, so a
+    repository without tags is told apart from one never synced.
+    """
+
+    SCHEMA = """
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE IF NOT EXISTS repositories (
+            organization TEXT NOT NULL,
+            repository TEXT NOT NULL,
+            synced TEXT NOT NULL,
+            PRIMARY KEY (organization, repository)
+        );
+        CREATE TABLE IF NOT EXISTS tags (
+            organization TEXT NOT NULL,
+            repository TEXT NOT NULL,
+            name TEXT NOT NULL,
+            last_updated TEXT,
+            digest TEXT,
+            PRIMARY KEY (organization, repository, name)
+        );
+        CREATE INDEX IF NOT EXISTS tags_by_last_updated ON tags (last_updated);
+    """
+
+    def __init__(self, index_file):
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(index_file, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.connection.close()
+
+    def is_synced(self, organization, repository_name):
+        """Return True if a repository has been synced."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM repositories WHERE organization = ? AND repository = ?",
+                (organization, repository_name),
+            ).fetchone()
+        return row is not None
+
+    def get_last_updated(self, organization, repository_name):
+        """Return {tag name: last_updated} of a repository's indexed tags."""
+        with self.lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT name, last_updated FROM tags"
+                    " WHERE organization = ? AND repository = ?",
+                    (organization, repository_name),
+                )
+            )
+
+    def get_tags(self, organization, repository_name):
+        """Return (name, digest) of every indexed tag of a repository."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT name, digest FROM tags WHERE organization = ? AND repository = ?",
+                (organization, repository_name),
+            ).fetchall()
+
+    def put_tags(self, organization, repository_name, tags, prune=False):
+        """Store TagRecords and mark the repository synced, in one transaction.
+
+        With "prune", "tags" is every tag of the repository, and indexed tags
+        not among them are deleted.  Return the number of tags deleted.
+        """
+        with self.lock, self.connection:
+            deleted = []
+            if prune:
+                names = {x.name for x in tags}
+                deleted = [
+                    (organization, repository_name, name)
+                    for (name,) in self.connection.execute(
+                        "SELECT name FROM tags WHERE organization = ? AND repository = ?",
+                        (organization, repository_name),
+                    )
+                    if name not in names
+                ]
+                self.connection.executemany(
+                    "DELETE FROM tags"
+                    " WHERE organization = ? AND repository = ? AND name = ?",
+                    deleted,
+                )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tags"
+                " (organization, repository, name, last_updated, digest)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    (organization, repository_name, x.name, x.last_updated, x.digest)
+                    for x in tags
+                ),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO repositories (organization, repository, synced)"
+                " VALUES (?, ?, ?)",
+                (
+                    organization,
+                    repository_name,
+                    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                ),
+            )
+        return len(deleted)
+
+
+# -----------------------------------------------------------------------------
+# Class Cassette
+# -----------------------------------------------------------------------------
+
+
+class Cassette:
+    """Gzipped JSON-lines file of recorded HTTP responses.
+
+    In "record" mode, every response is appended as it arrives.  In "replay"
+    mode, the file is loaded up front.  Responses to the same request are
+    replayed in recorded order; the last one repeats once they run out.
+    Replayed responses wait their recorded latency times "latency_scale".
+
+    Requests are told apart by method, URL and which of KEY_HEADERS they
+    send, so e.g. a 401 is not replayed to an authorized request.  Header
+    values, like credentials, are not recorded, and tokens in response
+    bodies are recorded as "REDACTED".
+    """
+
+    KEY_HEADERS = ["Authorization", "If-Modified-Since", "If-None-Match"]
+    REDACTED_KEYS = ["access_token", "refresh_token", "token"]
+    EXCLUDED_HEADERS = [
+        "content-encoding",
+        "content-length",
+        "set-cookie",
+        "transfer-encoding",
+    ]
+
+    def __init__(self, cassette_file, mode="replay", latency_scale=0.0):
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.interactions = {}
+        self.output_file = None
+        if mode == "record":
+            self.output_file = gzip.open(cassette_file, "wt", encoding="utf-8")
+            return
+        with gzip.open(cassette_file, "rt", encoding="utf-8") as input_file:
+            for line in input_file:
+                interaction = json.loads(line)
+                self.interactions.setdefault(
+                    (
+                        interaction.get("method"),
+                        interaction.get("url"),
+                        tuple(interaction.get("request_headers", [])),
+                    ),
+                    collections.deque(),
+                ).append(interaction)
+
+    def request_headers(self, request):
+        """Return names of KEY_HEADERS sent with a request."""
+        return [x for x in self.KEY_HEADERS if x in request.headers]
+
+    def close(self):
+        """Finish the cassette file."""
+        with self.lock:
+            if self.output_file:
+                self.output_file.close()
+                self.output_file = None
+
+    def record(self, request, response, elapsed):
+        """Append one request's response."""
+        interaction = {
+            "elapsed": round(elapsed, 6),
+            "headers": {
+                key: value
+                for key, value in response.headers.items()
+                if key.lower() not in self.EXCLUDED_HEADERS
+            },
+            "method": request.method,
+            "reason": response.reason,
+            "request_headers": self.request_headers(request),
+            "status_code": response.status_code,
+            "url": request.url,
+        }
+        try:
+            interaction["body"] = self.redact(response.content.decode("utf-8"))
+        except UnicodeDecodeError:
+            interaction["body_base64"] = base64.b64encode(response.content).decode()
+        line = json.dumps(interaction, sort_keys=True) + "\n"
+        with self.lock:
+            self.output_file.write(line)
+
+    def redact(self, body):
+        """Return a response body with the values of REDACTED_KEYS replaced."""
+        if not any(x in body for x in self.REDACTED_KEYS):
+            return body
+        try:
+            document = json.loads(body)
+        except ValueError:
+            return body
+        if not isinstance(document, dict):
+            return body
+        for key in self.REDACTED_KEYS:
+            if key in document:
+                document[key] = "REDACTED"
+        return json.dumps(document)
+
+    def replay(self, adapter, request):
+        """Return the recorded response to a request, built by "adapter"."""
+
+        import requests  # pylint: disable=import-outside-toplevel
+        import urllib3  # pylint: disable=import-outside-toplevel
+
+        with self.lock:
+            recorded = self.interactions.get(
+                (request.method, request.url, tuple(self.request_headers(request)))
+            )
+            if not recorded:
+                raise requests.ConnectionError(
+                    "No recorded response for {0} {1}".format(
+                        request.method, request.url
+                    ),
+                    request=request,
+                )
+            interaction = recorded.popleft() if len(recorded) > 1 else recorded[0]
+        if self.latency_scale:
+            time.sleep(interaction.get("elapsed", 0) * self.latency_scale)
+        if "body_base64" in interaction:
+            body = base64.b64decode(interaction.get("body_base64"))
+        else:
+            body = interaction.get("body", "").encode("utf-8")
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(body),
+            headers=interaction.get("headers"),
+            status=interaction.get("status_code"),
+            reason=interaction.get("reason"),
+            preload_content=False,
+        )
+        return adapter.build_response(request, raw)
+
+
+class CassetteAdapter:
+    """Transport adapter that records to, or replays from, a Cassette.
+
+    It is mounted on a requests.Session in place of the HTTPAdapter it wraps.
+    Recording sends requests through that adapter; replaying never touches
+    the network.
+    """
+
+    def __init__(self, cassette, adapter):
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        """Send a request, as requests.adapters.HTTPAdapter.send() does."""
+        if self.cassette.mode == "replay":
+            return self.cassette.replay(self.adapter, request)
+        start_time = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        _ = response.content  # Read the body, so its transfer time is recorded.
+        self.cassette.record(request, response, time.perf_counter() - start_time)
+        return response
+
+    def close(self):
+        """Release pooled connections of the wrapped adapter."""
+        self.adapter.close()
+
+
+def create_adapter(cassette=None, **kwargs):
+    """Return an HTTPAdapter, wrapped in a CassetteAdapter if there is a cassette."""
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    adapter = requests.adapters.HTTPAdapter(**kwargs)
+    if cassette:
+        adapter = CassetteAdapter(cassette, adapter)
+    return adapter
+
+
+# -----------------------------------------------------------------------------
+# Class RequestScheduler
+# -----------------------------------------------------------------------------
+
+
+class RequestScheduler:
+    """Pace requests to DockerHub's rate limit and retry throttled requests.
+
+    An adaptive token bucket spends the "X-RateLimit-Remaining" budget evenly
+    until "X-RateLimit-Reset".  Until DockerHub reports a limit, requests are
+    not delayed.
+    """
+
+    RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+    MAXIMUM_BACKOFF_IN_SECONDS = 60
+
+    def __init__(self, max_retries, backoff_in_seconds):
+        self.retry_settings = (max_retries, backoff_in_seconds)
+        self.lock = threading.Lock()
+        self.rate = None
+        self.capacity = 1.0
+        self.tokens = 1.0
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.rate is None:
+                    return
+                else:
+                    self.tokens = min(
+                        self.capacity,
+                        self.tokens + (now - self.updated_at) * self.rate,
+                    )
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update(self, response):
+        """Adapt the token bucket to the rate-limit headers of a response."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        retry_after = response.headers.get("Retry-After")
+        with self.lock:
+            now = time.monotonic()
+            if remaining is not None and reset is not None:
+                try:
+                    remaining = int(remaining)
+                    seconds_to_reset = max(float(reset) - time.time(), 1.0)
+                except ValueError:
+                    return
+                self.rate = max(remaining, 0) / seconds_to_reset
+                self.capacity = max(self.rate, 1.0)
+                self.tokens = min(self.tokens, self.capacity)
+                if remaining <= 0:
+                    self.blocked_until = max(self.blocked_until, now + seconds_to_reset)
+            if response.status_code == 429 and retry_after is not None:
+                try:
+                    self.blocked_until = max(
+                        self.blocked_until, now + float(retry_after)
+                    )
+                except ValueError:
+                    pass
+
+    def should_retry(self, response, attempt):
+        """Return True if a response is worth another attempt.
+
+        "response" is None for a connection that failed or timed out.
+        """
+        return attempt < self.retry_settings[0] and (
+            response is None or response.status_code in self.RETRY_STATUS_CODES
+        )
+
+    def backoff(self, attempt):
+        """Return an exponential delay with full jitter for a retry."""
+        return random.uniform(
+            0,
+            min(
+                self.MAXIMUM_BACKOFF_IN_SECONDS,
+                self.retry_settings[1] * 2**attempt,
+            ),
+        )
+
+
+# -----------------------------------------------------------------------------
+# Class DockerHubAuthenticator
+# -----------------------------------------------------------------------------
+
+
+class DockerHubAuthenticator:
+    """Log in to DockerHub and keep its JWT fresh.
+
+    The token is kept until shortly before its "exp" claim.  With a token
+    file, it is also cached on disk, readable only by its owner, so later
+    runs and concurrent processes reuse it instead of logging in again.
+    A thread lock serializes logins within a process; an exclusive flock on
+    "<token file>.lock" serializes them across processes.
+    """
+
+    DEFAULT_LIFETIME_IN_SECONDS = 300
+    EXPIRY_MARGIN_IN_SECONDS = 60
+
+    def __init__(self, session, login_url, username, password, token_file=None):
+        self.session = session
+        self.login_url = login_url
+        self.credentials = {"username": username, "password": password}
+        self.token_file = token_file
+        self.lock = threading.Lock()
+        self.token = None
+        self.expires = 0.0
+
+    def is_fresh(self, expires):
+        """Return True if a token expiring at "expires" can still be used."""
+        return expires - self.EXPIRY_MARGIN_IN_SECONDS > time.time()
+
+    def get_token(self, rejected=None):
+        """Return a fresh token, or None to continue anonymously.
+
+        "rejected" is a token DockerHub answered with 401.  It is not
+        returned again; the user logs in anew instead.
+        """
+
+        with self.lock:
+            if self.is_fresh(self.expires) and (
+                rejected is None or self.token != rejected
+            ):
+                return self.token
+            with self.token_file_lock():
+                cached = self.read_token_file()
+                if (
+                    cached.get("login_url") == self.login_url
+                    and cached.get("username") == self.credentials.get("username")
+                    and cached.get("token") not in [None, rejected]
+                    and self.is_fresh(cached.get("expires", 0))
+                ):
+                    self.token = cached.get("token")
+                    self.expires = cached.get("expires")
+                    return self.token
+                self.token, self.expires = self.login()
+                if self.token:
+                    self.write_token_file()
+            return self.token
+
+    def login(self):
+        """Return (token, expiry time) from a new login.
+
+        After a failed login, the token is None for DEFAULT_LIFETIME_IN_SECONDS,
+        so requests continue anonymously instead of logging in again each time.
+        """
+
+        import requests  # pylint: disable=import-outside-toplevel
+
+        fallback_expires = (
+            time.time()
+            + self.DEFAULT_LIFETIME_IN_SECONDS
+            + self.EXPIRY_MARGIN_IN_SECONDS
+        )
+        try:
+            response = self.session.post(
+                self.login_url,
+                json=self.credentials,
+                timeout=30,
+            )
+            response.raise_for_status()
+            token = response.json().get("token")
+        except (requests.RequestException, ValueError) as err:
+            logging.warning(message_warning(308, self.credentials.get("username"), err))
+            return None, fallback_expires
+        if not token:
+            logging.warning(
+                message_warning(308, self.credentials.get("username"), "No token")
+            )
+            return None, fallback_expires
+        expires = jwt_expiry(token)
+        if expires is None:
+            expires = fallback_expires
+        return token, expires
+
+    @contextlib.contextmanager
+    def token_file_lock(self):
+        """Hold an exclusive lock of the token file across processes."""
+
+        if not self.token_file:
+            yield
+            return
+
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.token_file)), exist_ok=True)
+        with open(self.token_file + ".lock", "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_token_file(self):
+        """Return the cached token, or {}."""
+        if not self.token_file:
+            return {}
+        try:
+            with open(self.token_file, encoding="utf-8") as token_file:
+                return json.load(token_file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_token_file(self):
+        """Atomically replace the token file, readable only by its owner."""
+        if not self.token_file:
+            return
+        temporary_token_file = "{0}.{1}".format(self.token_file, os.getpid())
+        file_descriptor = os.open(
+            temporary_token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as token_file:
+            json.dump(
+                {
+                    "expires": self.expires,
+                    "login_url": self.login_url,
+                    "token": self.token,
+                    "username": self.credentials.get("username"),
+                },
+                token_file,
+            )
+        os.replace(temporary_token_file, self.token_file)
+
+
+# -----------------------------------------------------------------------------
+# Class DockerHubClient
+# Inspired by https://github.com/amalfra/docker-hub/blob/master/src/libs/docker_hub_client.py
+# -----------------------------------------------------------------------------
+
+
+# The client owns every resource a run shares across threads: the session,
+# the executor, the scheduler, the caches, the index and the registry client.
+# Grouping them would only hide that.
+
+
+class DockerHubClient:  # pylint: disable=too-many-instance-attributes
+    """Wrapper to communicate with docker hub API
+
+    Every request goes through "cassette", if given, or through a Cassette
+    of SENZING_CASSETTE_FILE.  Only a cassette the client opened itself is
+    closed with it.
+    """
+
+    def __init__(self, config, cassette=None):
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+        import requests  # pylint: disable=import-outside-toplevel
+
+        self.auth_token = config.get("auth_token")
+        self.dockerhub_api_endpoint_v2 = config.get("dockerhub_api_endpoint_v2")
+        self.valid_methods = ["GET", "POST"]
+
+        # One long-lived session per client, so keep-alive connections are
+        # reused across calls instead of paying a TCP+TLS handshake per request.
+
+        self.owned_cassette = None
+        if cassette is None and config.get("cassette_file"):
+            cassette = self.owned_cassette = Cassette(
+                config.get("cassette_file"),
+                config.get("cassette_mode", "replay"),
+                config.get("cassette_latency_scale", 0.0),
+            )
+        # Requests come from up to "workers" caller threads, plus the
+        # client's own "pool size" threads prefetching pages.  The connection
+        # pool holds a connection for each, so urllib3 never discards a
+        # keep-alive connection for lack of room.
+
+        pool_size = config.get("dockerhub_pool_size", 10)
+        workers = max(config.get("dockerhub_workers", 8), 1)
+        adapter = create_adapter(
+            cassette, pool_connections=pool_size, pool_maxsize=pool_size + workers
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # With credentials, log in once and share the token across runs.
+
+        self.authenticator = None
+        if config.get("dockerhub_username") and config.get("dockerhub_password"):
+            token_file = config.get("dockerhub_token_file")
+            if not token_file and config.get("cache_dir"):
+                token_file = os.path.join(
+                    config.get("cache_dir"), "dockerhub-token.json"
+                )
+            self.authenticator = DockerHubAuthenticator(
+                self.session,
+                "{0}/users/login".format(self.dockerhub_api_endpoint_v2),
+                config.get("dockerhub_username"),
+                config.get("dockerhub_password"),
+                token_file,
+            )
+        self.page_size = config.get("dockerhub_page_size", 100)
+        self.timeout_in_seconds = config.get("dockerhub_timeout_in_seconds", 30)
+        self.pool_size = pool_size
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=pool_size, initializer=PROFILER.start_thread
+        )
+        self.scheduler = RequestScheduler(
+            config.get("dockerhub_max_retries", 5),
+            config.get("dockerhub_backoff_in_seconds", 1),
+        )
+        self.response_cache = None
+        if config.get("cache_dir"):
+            self.response_cache = ResponseCache(
+                config.get("cache_dir"),
+                config.get("cache_ttl_in_seconds", 300),
+                config.get("cache_max_size_in_megabytes", 100) * MEGABYTES,
+            )
+        self.registry_client = RegistryClient(config, cassette)
+        self.digest_cache = None
+        if config.get("cache_dir"):
+            self.digest_cache = DigestCache(
+                os.path.join(config.get("cache_dir"), "digests")
+            )
+        self.tag_index = None
+        if config.get("index_file"):
+            self.tag_index = TagIndex(config.get("index_file"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release pooled connections."""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        self.registry_client.close()
+        if self.tag_index:
+            self.tag_index.close()
+        if self.owned_cassette:
+            self.owned_cassette.close()
+        if self.response_cache:
+            self.response_cache.evict()
+
+    def do_request(self, url, method="GET", data=None):
+        """Make an HTTP request."""
+        if method not in self.valid_methods:
+            raise ValueError("Invalid HTTP request method")
+        headers = {"Content-type": "application/json"}
+
+        # Serve fresh cache entries locally; revalidate stale ones.
+        # "cache_entry" is None when the response is not cached at all.
+
+        cache_entry = None
+        if self.response_cache and method == "GET":
+            cache_entry = self.response_cache.get(url)
+            cache_metadata = cache_entry[0]
+            if cache_metadata:
+                if self.response_cache.is_fresh(cache_metadata):
+                    METRICS.increment(
+                        "dockerhub_util_cache_requests_total", {"result": "hit"}
+                    )
+                    return load_compact(
+                        cache_metadata.get("record_type"), cache_entry[1]
+                    )
+                if cache_metadata.get("etag"):
+                    headers["If-None-Match"] = cache_metadata.get("etag")
+                if cache_metadata.get("last_modified"):
+                    headers["If-Modified-Since"] = cache_metadata.get("last_modified")
+
+        # Only requests that go over the network need a token, so a run
+        # served from the cache never logs in.
+
+        auth_token = self.auth_token
+        if self.authenticator:
+            auth_token = self.authenticator.get_token()
+        if auth_token:
+            headers["Authorization"] = "JWT " + auth_token
+        network_wait_start_time = time.perf_counter()
+        response = self.send(
+            method,
+            url,
+            headers,
+            json.dumps(data, indent=2, sort_keys=True) if data else None,
+        )
+        METRICS.add_phase("network_wait", time.perf_counter() - network_wait_start_time)
+        return self.handle_response(url, response, cache_entry)
+
+    def send(self, method, url, headers, data=None):
+        """Send a request, pacing and retrying it as the scheduler decides.
+
+        Failed connections, timeouts and throttled or failed responses are
+        retried with backoff.  A rejected token, e.g. revoked before its
+        expiry, is replaced once.
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        endpoint = endpoint_label(url)
+        registry = urllib.parse.urlparse(url).netloc
+        attempt = 0
+        reauthenticated = False
+        while True:
+            self.scheduler.acquire()
+            start_time = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    data=data,
+                    headers=headers,
+                    timeout=self.timeout_in_seconds,
+                )
+            except (requests.ConnectionError, requests.Timeout) as err:
+                if not self.scheduler.should_retry(None, attempt):
+                    raise
+                backoff = self.scheduler.backoff(attempt)
+                logging.warning(message_warning(310, url, backoff, err))
+                time.sleep(backoff)
+                attempt += 1
+                continue
+            labels = {
+                "endpoint": endpoint,
+                "registry": registry,
+                "status_code": response.status_code,
+            }
+            METRICS.observe(
+                "dockerhub_util_request_duration_seconds",
+                time.perf_counter() - start_time,
+                labels,
+            )
+            METRICS.increment("dockerhub_util_requests_total", labels)
+            self.scheduler.update(response)
+            if (
+                response.status_code == 401
+                and self.authenticator
+                and "Authorization" in headers
+                and not reauthenticated
+            ):
+                reauthenticated = True
+                auth_token = self.authenticator.get_token(
+                    rejected=headers.pop("Authorization")[len("JWT ") :]
+                )
+                if auth_token:
+                    headers["Authorization"] = "JWT " + auth_token
+                continue
+            if not self.scheduler.should_retry(response, attempt):
+                return response
+            backoff = self.scheduler.backoff(attempt)
+            logging.warning(message_warning(302, response.status_code, url, backoff))
+            time.sleep(backoff)
+            attempt += 1
+
+    def handle_response(self, url, response, cache_entry=None):
+        """Return the result of a response, caching it if "cache_entry" is given.
+
+        "cache_entry" is the (metadata, body) found in the response cache for
+        the URL.  A 304 response returns the cached body.
+        """
+
+        # Throttling or server errors that outlast every retry are raised,
+        # rather than being mistaken for a missing repository.
+
+        if response.status_code in self.scheduler.RETRY_STATUS_CODES:
+            response.raise_for_status()
+        cache_metadata, cache_body = cache_entry or (None, None)
+        if cache_entry is not None:
+            METRICS.increment(
+                "dockerhub_util_cache_requests_total",
+                {
+                    "result": (
+                        "not_modified"
+                        if response.status_code == 304 and cache_metadata
+                        else "miss"
+                    )
+                },
+            )
+        result = {}
+        if response.status_code == 304 and cache_metadata:
+            self.response_cache.refresh(url, response, cache_metadata, cache_body)
+            result = load_compact(cache_metadata.get("record_type"), cache_body)
+        elif response.status_code == 200:
+            result = parse_results(response.content)
+            if cache_entry is not None:
+                self.response_cache.put(url, response, *dump_compact(result))
+        return result
+
+    def get_repositories(self, organization, page=1):
+        """Return one page of repositories, ordered by name."""
+        url = "{0}/repositories/{1}/?page_size={2}&page={3}&ordering=name".format(
+            self.dockerhub_api_endpoint_v2, organization, self.page_size, page
+        )
+        return self.do_request(url)
+
+    def iter_repositories(self, organization):
+        """Return an iterator over every repository of an organization, by name.
+
+        The first page is requested right away, not on first iteration, so
+        iterators over several organizations fetch their first pages together.
+        """
+        first_page = self.executor.submit(self.get_repositories, organization)
+        return self.iter_repository_pages(organization, first_page)
+
+    def iter_repository_pages(self, organization, first_page):
+        """Yield every repository of an organization, sorted by name.
+
+        Once the first page reports "count", the remaining pages are fetched
+        concurrently, at most "pool size" pages ahead of the consumer.  Pages
+        are yielded in page order, so output streams in name order while
+        memory stays bounded by the look-ahead window.
+
+        DockerHub caps "page_size", so the page count comes from the length of
+        the first page rather than from the requested page size.
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        response = first_page.result()
+        results = response.get("results", [])
+        page_count = 1
+        if response.get("next") and results:
+            page_count = -(-response.get("count", 0) // len(results))
+        pages = iter(range(2, page_count + 1))
+        futures = collections.deque(
+            (page, self.executor.submit(self.get_repositories, organization, page))
+            for page in itertools.islice(pages, self.pool_size)
+        )
+        while True:
+            yield from sorted(results, key=lambda x: x.name)
+            if not futures:
+                break
+            page, future = futures.popleft()
+            results = future.result().get("results", [])
+            if not results:
+                raise requests.HTTPError(
+                    "Page {0} of {1} repositories of {2} is empty".format(
+                        page, page_count, organization
+                    )
+                )
+            for page in itertools.islice(pages, 1):
+                futures.append(
+                    (
+                        page,
+                        self.executor.submit(self.get_repositories, organization, page),
+                    )
+                )
+
+    def get_repository_tags(self, organization, repository_name, ordering=None):
+        """Return the first page of repository tags for a repository.
+
+        With ordering="last_updated", the most recently updated tags come first.
+        """
+        url = "{0}/repositories/{1}/{2}/tags?page_size={3}".format(
+            self.dockerhub_api_endpoint_v2,
+            organization,
+            repository_name,
+            self.page_size,
+        )
+        if ordering:
+            url += "&ordering={0}".format(ordering)
+        return self.do_request(url)
+
+    def get_repository_tag(self, organization, repository_name, tag):
+        """Return one tag of a repository, or {} if it does not exist."""
+        url = "{0}/repositories/{1}/{2}/tags/{3}".format(
+            self.dockerhub_api_endpoint_v2, organization, repository_name, tag
+        )
+        return self.do_request(url)
+
+    def iter_results(self, response, prefetch=True):
+        """Yield "results" of a response and of every page linked by "next".
+
+        The next page is requested before the current page is yielded,
+        so it is in flight while the consumer works through the current one.
+        Without "prefetch", it is only requested once the current page is
+        consumed, for consumers that may stop early.
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        while response:
+            next_url = response.get("next")
+            future = None
+            if next_url and prefetch:
+                future = self.executor.submit(self.do_request, next_url)
+            yield from response.get("results", [])
+            if not next_url:
+                break
+            response = future.result() if future else self.do_request(next_url)
+            if not response:
+                raise requests.HTTPError("Empty page: {0}".format(next_url))
+
+    def iter_repository_tags(self, organization, repository_name):
+        """Yield every tag of a repository, page by page."""
+        return self.iter_results(
+            self.get_repository_tags(organization, repository_name)
+        )
+
+
+# -----------------------------------------------------------------------------
+# Class RegistryTokens
+# See https://distribution.github.io/distribution/spec/auth/token/
+# -----------------------------------------------------------------------------
+
+
+class RegistryTokens:
+    """Anonymous Bearer tokens of third-party registries.
+
+    Tokens are kept per challenge (realm, service, scope) until shortly
+    before they expire.  Each repository remembers the challenge it was
+    sent, so later requests carry its token without a 401 round trip.
+    """
+
+    DEFAULT_LIFETIME_IN_SECONDS = 60
+    EXPIRY_MARGIN_IN_SECONDS = 5
+    REPOSITORY_PATTERN = re.compile(r"^/v2/(?P<name>.+?)/(?:tags|manifests|blobs)/")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.challenges = {}
+
+    def repository(self, url):
+        """Return (host, repository name) of a registry URL."""
+        parsed_url = urllib.parse.urlparse(url)
+        match = self.REPOSITORY_PATTERN.match(parsed_url.path)
+        return parsed_url.netloc, match.group("name") if match else parsed_url.path
+
+    def get(self, url):
+        """Return the unexpired token for the repository of a URL, or None."""
+        with self.lock:
+            key = self.challenges.get(self.repository(url))
+            token, expires = self.tokens.get(key, (None, 0.0))
+        if expires - self.EXPIRY_MARGIN_IN_SECONDS > time.time():
+            return token
+        return None
+
+    def fetch(self, session, challenge, url, timeout, rejected=None):
+        """Return a token for a "WWW-Authenticate: Bearer" challenge, or None.
+
+        A token of the same challenge is reused unless it expired or is
+        "rejected", the token the registry just answered with 401.
+        """
+
+        parameters = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = parameters.pop("realm", None)
+        if not realm:
+            return None
+        key = (realm, parameters.get("service"), parameters.get("scope"))
+        with self.lock:
+            self.challenges[self.repository(url)] = key
+            if self.tokens.get(key, (None,))[0] == rejected:
+                self.tokens.pop(key, None)
+        token = self.get(url)
+        if token is None:
+            response = session.get(realm, params=parameters, timeout=timeout)
+            response.raise_for_status()
+            body = json.loads(response.content)
+            token = body.get("token") or body.get("access_token")
+            lifetime = body.get("expires_in") or self.DEFAULT_LIFETIME_IN_SECONDS
+            with self.lock:
+                self.tokens[key] = (token, time.time() + lifetime)
+        return token
+
+
+# -----------------------------------------------------------------------------
+# Class RegistryClient
+# See https://github.com/opencontainers/distribution-spec/blob/main/spec.md
+# -----------------------------------------------------------------------------
+
+
+class RegistryClient:
+    """Read tags from third-party OCI registries, like mcr.microsoft.com.
+
+    Every registry host has its own connection pool, concurrency limit and
+    retry scheduler, so a slow registry cannot hold up DockerHub requests or
+    other registries.
+    """
+
+    def __init__(self, config, cassette=None):
+        self.cassette = cassette
+        self.pool_size = max(config.get("registry_pool_size", 4), 1)
+        self.timeout_in_seconds = config.get("registry_timeout_in_seconds", 30)
+        self.retry_settings = (
+            config.get("dockerhub_max_retries", 5),
+            config.get("dockerhub_backoff_in_seconds", 1),
+        )
+        self.hosts = {}
+        self.tokens = RegistryTokens()
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Release pooled connections of every host."""
+        with self.lock:
+            for session, _, _ in self.hosts.values():
+                session.close()
+            self.hosts.clear()
+
+    def host(self, url):
+        """Return (session, semaphore, scheduler) of the host of a URL."""
+
+        import requests  # pylint: disable=import-outside-toplevel
+
+        netloc = urllib.parse.urlparse(url).netloc
+        with self.lock:
+            if netloc not in self.hosts:
+                adapter = create_adapter(
+                    self.cassette, pool_connections=1, pool_maxsize=self.pool_size
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.hosts[netloc] = (
+                    session,
+                    threading.BoundedSemaphore(self.pool_size),
+                    RequestScheduler(*self.retry_settings),
+                )
+            return self.hosts[netloc]
+
+    def do_request(self, url, method="GET", accept="application/json"):
+        """Request a registry URL, retrying throttled and failed requests."""
+
+        session, semaphore, scheduler = self.host(url)
+        headers = {"Accept": accept}
+        token = self.tokens.get(url)
+        if token:
+            headers["Authorization"] = "Bearer " + token
+        endpoint = endpoint_label(url)
+        registry = urllib.parse.urlparse(url).netloc
+        attempt = 0
+        reauthenticated = False
+        with semaphore:
+            network_wait_start_time = time.perf_counter()
+            while True:
+                scheduler.acquire()
+                start_time = time.perf_counter()
+                response = session.request(
+                    method, url, headers=headers, timeout=self.timeout_in_seconds
+                )
+                labels = {
+                    "endpoint": endpoint,
+                    "registry": registry,
+                    "status_code": response.status_code,
+                }
+                METRICS.observe(
+                    "dockerhub_util_request_duration_seconds",
+                    time.perf_counter() - start_time,
+                    labels,
+                )
+                METRICS.increment("dockerhub_util_requests_total", labels)
+                scheduler.update(response)
+
+                # Registries like ghcr.io want an anonymous token even for
+                # public images.  A missing or rejected token is fetched
+                # once, then the request is sent again.
+
+                challenge = response.headers.get("WWW-Authenticate", "")
+                if (
+                    response.status_code == 401
+                    and not reauthenticated
+                    and challenge.lower().startswith("bearer ")
+                ):
+                    reauthenticated = True
+                    token = self.tokens.fetch(
+                        session, challenge, url, self.timeout_in_seconds, token
+                    )
+                    if token:
+                        headers["Authorization"] = "Bearer " + token
+                        continue
+                if not scheduler.should_retry(response, attempt):
+                    break
+                backoff = scheduler.backoff(attempt)
+                logging.warning(
+                    message_warning(303, response.status_code, url, backoff)
+                )
+                time.sleep(backoff)
+                attempt += 1
+            METRICS.add_phase(
+                "network_wait", time.perf_counter() - network_wait_start_time
+            )
+        response.raise_for_status()
+        return response
+
+    def get_manifest_digest(self, url):
+        """Return the digest of the manifest at a /v2/{name}/manifests/ URL."""
+        response = self.do_request(
+            url, method="HEAD", accept=", ".join(MANIFEST_MEDIA_TYPES)
+        )
+        return response.headers.get("Docker-Content-Digest")
+
+    def iter_tags(self, url):
+        """Yield every tag of a "/v2/{name}/tags/list" URL.
+
+        Pages are followed through "Link: <...>; rel="next"" headers.
+        """
+        while url:
+            response = self.do_request(url)
+            with METRICS.phase("json_decode"):
+                tags = json.loads(response.content).get("tags") or []
+            yield from tags
+            next_url = response.links.get("next", {}).get("url")
+            url = urllib.parse.urljoin(url, next_url) if next_url else None
+
+
+# -----------------------------------------------------------------------------
+# Class TagPolicy
+# -----------------------------------------------------------------------------
+
+
+class TagPolicy:
+    """Choose a tag of a repository by the "policy" of its catalog entry.
+
+    A policy is a dict of optional filters, all of which must match:
+      "constraint": PEP 440 specifiers, e.g. ">=8,<9"
+      "major": major version line, e.g. 8
+      "pattern": regular expression the whole tag must match, for tags that
+        parse_tag() cannot split, e.g. "(\\d+)-CU(\\d+)-ubuntu-22\\.04".  Its
+        first group is the version; later groups are numbers ranking tags of
+        the same version, like a revision.  Default: none
+      "prereleases": true to allow pre-releases.  Default: false
+      "suffix": suffix family, e.g. "debian-11".  Default: "" (plain versions)
+
+    One pass over the tags computes every answer at once: the latest stable
+    version, the latest per major line, the latest per suffix family and
+    the latest tag matching the policy.
+    """
+
+    POLICY_KEYS = ["constraint", "major", "pattern", "prereleases", "suffix"]
+
+    def __init__(self, policy=None):
+        from packaging.specifiers import (  # pylint: disable=import-outside-toplevel
+            SpecifierSet,
+        )
+
+        policy = policy or {}
+        if not isinstance(policy, dict) or set(policy) - set(self.POLICY_KEYS):
+            raise ValueError(
+                "Bad policy {0}. Keys: {1}".format(policy, ", ".join(self.POLICY_KEYS))
+            )
+        self.constraint = None
+        if policy.get("constraint"):
+            self.constraint = SpecifierSet(policy.get("constraint"))
+        self.major = policy.get("major")
+        self.pattern = None
+        if policy.get("pattern"):
+            try:
+                self.pattern = re.compile(policy.get("pattern"))
+            except re.error as err:
+                raise ValueError(
+                    "Bad policy pattern {0}. Error: {1}".format(
+                        policy.get("pattern"), err
+                    )
+                ) from err
+            if self.pattern.groups < 1:
+                raise ValueError(
+                    "Bad policy pattern {0}. Needs a version group".format(
+                        policy.get("pattern")
+                    )
+                )
+        self.prereleases = bool(policy.get("prereleases", False))
+        self.suffix = policy.get("suffix", "")
+        self.latest = {"major": {}, "suffix": {}}
+        self.latest_matching = None
+
+    @staticmethod
+    def update(latest, key, sort_key, tag):
+        """Keep the tag with the highest sort key for a key of "latest"."""
+        if key not in latest or sort_key > latest[key][0]:
+            latest[key] = (sort_key, tag)
+
+    def matches(self, parsed_tag):
+        """Return True if a parsed tag passes every filter of the policy."""
+        version = parsed_tag.version
+        return (
+            parsed_tag.suffix == self.suffix
+            and (self.prereleases or not version.is_prerelease)
+            and (self.major is None or version.major == self.major)
+            and (
+                self.constraint is None
+                or self.constraint.contains(version, prereleases=self.prereleases)
+            )
+        )
+
+    def parse(self, tag):
+        """Return the ParsedTag of a tag, by the policy's "pattern" if any."""
+        from packaging.version import (  # pylint: disable=import-outside-toplevel
+            InvalidVersion,
+            Version,
+        )
+
+        if self.pattern is None:
+            return parse_tag(tag)
+        match = self.pattern.fullmatch(tag)
+        if match is None:
+            return None
+        try:
+            return ParsedTag(
+                Version(match.group(1)),
+                "",
+                tuple(int(x or 0) for x in match.groups()[1:]),
+            )
+        except (InvalidVersion, ValueError):
+            return None
+
+    def observe(self, tag, digest=None):
+        """Account for one tag and, if known, its digest."""
+        parsed_tag = self.parse(tag)
+        if parsed_tag is None:
+            return
+        sort_key = (parsed_tag.version, parsed_tag.revision)
+        if not parsed_tag.version.is_prerelease:
+            self.update(self.latest["suffix"], parsed_tag.suffix, sort_key, tag)
+            if not parsed_tag.suffix:
+                self.update(
+                    self.latest["major"], parsed_tag.version.major, sort_key, tag
+                )
+        if self.matches(parsed_tag) and (
+            self.latest_matching is None or sort_key > self.latest_matching[0]
+        ):
+            self.latest_matching = (sort_key, tag, digest)
+
+    def answers(self):
+        """Return every answer of the pass, as tags."""
+        return {
+            "latest": self.latest["suffix"].get("", (None, None))[1],
+            "latest_by_major": {
+                major: tag for major, (_, tag) in sorted(self.latest["major"].items())
+            },
+            "latest_by_suffix": {
+                suffix: tag
+                for suffix, (_, tag) in sorted(self.latest["suffix"].items())
+            },
+            "latest_matching": self.select(),
+        }
+
+    def select(self):
+        """Return the latest tag matching the policy, as written, or None."""
+        if self.latest_matching is None:
+            return None
+        return self.latest_matching[1]
+
+    def select_digest(self):
+        """Return the digest seen with the selected tag, or None."""
+        if self.latest_matching is None:
+            return None
+        return self.latest_matching[2]
+
+
+# -----------------------------------------------------------------------------
+# Class Snapshot
+# -----------------------------------------------------------------------------
+
+
+class Snapshot:
+    """Thread-safe holder of the most recently rendered reports."""
+
+    def __init__(self, max_age_in_seconds):
+        self.lock = threading.Lock()
+        self.max_age_in_seconds = max_age_in_seconds
+        self.payloads = {}
+        self.refreshed_at = None
+
+    def update(self, payloads):
+        """Replace every payload at once."""
+        with self.lock:
+            self.payloads = payloads
+            self.refreshed_at = time.time()
+
+    def get(self, name):
+        """Return a payload, or None if it has not been rendered yet."""
+        with self.lock:
+            return self.payloads.get(name)
+
+    def health(self):
+        """Return (is_healthy, details) describing freshness of the snapshot."""
+        with self.lock:
+            refreshed_at = self.refreshed_at
+        if refreshed_at is None:
+            return False, {"status": "initializing"}
+        age_in_seconds = time.time() - refreshed_at
+        is_healthy = age_in_seconds <= self.max_age_in_seconds
+        return is_healthy, {
+            "age_in_seconds": round(age_in_seconds, 3),
+            "refreshed_at": refreshed_at,
+            "status": "ok" if is_healthy else "stale",
+        }
+
+
+# -----------------------------------------------------------------------------
+# Class VersionRecordWriter
+# -----------------------------------------------------------------------------
+
+
+class VersionRecordWriter:
+    """Write version records as NDJSON lines or as a JSON array, one at a time.
+
+    Every record is flushed as it is written, so a consumer reading the
+    output can act on it while later records are still being resolved.
+    """
+
+    def __init__(self, output_format, output_file=None):
+        self.output_format = output_format
+        self.output_file = output_file or sys.stdout
+        self.count = 0
+
+    def write(self, record):
+        """Write one record.  Records without a version are skipped."""
+        if record.get("version") is None:
+            return
+        with METRICS.phase("output_rendering"):
+            text = json.dumps(record, sort_keys=True)
+            if self.output_format == "json":
+                text = ("[\n  " if self.count == 0 else ",\n  ") + text
+            else:
+                text += "\n"
+            self.output_file.write(text)
+            self.output_file.flush()
+        self.count += 1
+
+    def close(self):
+        """Finish the output, e.g. close the JSON array."""
+        if self.output_format == "json":
+            self.output_file.write("[\n]\n" if self.count == 0 else "\n]\n")
+        self.output_file.flush()
+
+
+# -----------------------------------------------------------------------------
+# Class SnapshotRequestHandler
+# -----------------------------------------------------------------------------
+
+
+def create_snapshot_request_handler_class():
+    """Tricky code.  The class is created on demand so that "http.server" is
+    only imported by the "serve" subcommand.
+    """
+
+    import http.server  # pylint: disable=import-outside-toplevel
+
+    class SnapshotRequestHandler(http.server.BaseHTTPRequestHandler):
+        """Serve reports from the Snapshot attached to the HTTP server."""
+
+        CONTENT_TYPES = {
+            "print-active-image-names": "text/plain; charset=utf-8",
+            "print-image-names": "application/json",
+            "print-latest-versions": "text/x-shellscript; charset=utf-8",
+        }
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Answer a GET request from memory."""
+            path = self.path.split("?", 1)[0].strip("/")
+            snapshot = self.server.snapshot
+            if path == "metrics":
+                self.send_payload(
+                    200, "text/plain; version=0.0.4; charset=utf-8", METRICS.render()
+                )
+            elif path == "healthz":
+                is_healthy, details = snapshot.health()
+                self.send_payload(
+                    200 if is_healthy else 503,
+                    "application/json",
+                    json.dumps(details, sort_keys=True) + "\n",
+                )
+            elif path in self.CONTENT_TYPES:
+                payload = snapshot.get(path)
+                if payload is None:
+                    self.send_payload(503, "text/plain", "Snapshot not ready.\n")
+                else:
+                    self.send_payload(200, self.CONTENT_TYPES[path], payload)
+            else:
+                self.send_payload(404, "text/plain", "Not found.\n")
+
+        def send_payload(self, status_code, content_type, payload):
+            """Send a complete response."""
+            body = payload.encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            logging.debug(message_debug(999, format % args))
+
+    return SnapshotRequestHandler
+
+
+# -----------------------------------------------------------------------------
+# Utility functions
+# -----------------------------------------------------------------------------
+
+
+def create_signal_handler_function(args):
+    """Tricky code.  Uses currying technique. Create a function for signal handling.
+    that knows about "args".
+    """
+
+    def result_function(signal_number, frame):
+        logging.info(message_info(298, args))
+        logging.debug(message_debug(901, signal_number, frame))
+        sys.exit(0)
+
+    return result_function
+
+
+def bootstrap_signal_handler(signal_number, frame):
+    """Exit on signal error."""
+    logging.debug(message_debug(901, signal_number, frame))
+    sys.exit(0)
+
+
+def entry_template(config):
+    """Format of entry message."""
+    debug = config.get("debug", False)
+    config["start_time"] = time.time()
+    if debug:
+        final_config = config
+    else:
+        final_config = redact_configuration(config)
+    config_json = json.dumps(final_config, sort_keys=True)
+    return message_info(297, config_json)
+
+
+def exit_template(config):
+    """Format of exit message."""
+    debug = config.get("debug", False)
+    stop_time = time.time()
+    config["stop_time"] = stop_time
+    config["elapsed_time"] = stop_time - config.get("start_time", stop_time)
+    config["phase_times"] = METRICS.phase_times()
+    if debug:
+        final_config = config
+    else:
+        final_config = redact_configuration(config)
+    config_json = json.dumps(final_config, sort_keys=True)
+    return message_info(298, config_json)
+
+
+def exit_error(index, *args):
+    """Log error message and exit program."""
+    logging.error(message_error(index, *args))
+    logging.error(message_error(698))
+    sys.exit(1)
+
+
+def exit_silently():
+    """Exit program."""
+    sys.exit(0)
+
+
+# -----------------------------------------------------------------------------
+# Helper functions
+# -----------------------------------------------------------------------------
+
+
+def jwt_expiry(token):
+    """Return the "exp" claim of a JWT, or None if it has none."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def redacted(key):
+    """Determine if a key is redacted."""
+
+    for redact in REDACT_VERSIONS:
+        if key.startswith(redact):
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_tag(tag):
+    """Return ParsedTag(version, suffix, revision) of a tag, or None.
+
+    PEP 440 tags parse as they are.  Others, like "8.2.0-debian-11-r4", are
+    split into a version ("8.2.0"), a suffix family ("debian-11") and a
+    revision (4).  Tags are shared by many repositories, so results are
+    cached.
+    """
+
+    from packaging.version import (  # pylint: disable=import-outside-toplevel
+        InvalidVersion,
+        Version,
+    )
+
+    if redacted(tag):
+        return None
+    try:
+        return ParsedTag(Version(tag), "", 0)
+    except InvalidVersion:
+        pass
+    match = TAG_PATTERN.match(tag)
+    if match is None:
+        return None
+    return ParsedTag(
+        Version(match.group("version")),
+        match.group("suffix"),
+        int(match.group("revision") or 0),
+    )
+
+
+def image_name(repository):
+    """Return "namespace/name" for a repository returned by DockerHub."""
+    return "{0}/{1}".format(repository.namespace, repository.name)
+
+
+def active_organizations(config):
+    """Return the organizations whose images are listed, without duplicates."""
+
+    organizations = config.get("dockerhub_organizations") or [
+        config.get("dockerhub_organization")
+    ]
+    return list(dict.fromkeys(organizations))
+
+
+def get_active_image_names(config, dockerhub_client):
+    """Yield sorted names of Docker images hosted on DockerHub.
+
+    Every organization is listed concurrently as its own stream sorted by
+    name.  The streams are merged lazily, so no list of every image is built.
+    """
+
+    streams = [
+        (
+            image_name(repository)
+            for repository in dockerhub_client.iter_repositories(organization)
+        )
+        for organization in active_organizations(config)
+    ]
+    yield from heapq.merge(*streams)
+
+
+def print_active_image_names(config, dockerhub_client):
+    """Print sorted names of Docker images hosted on DockerHub."""
+
+    print_format = config.get("print_format", {})
+    for repository in get_active_image_names(config, dockerhub_client):
+        with METRICS.phase("output_rendering"):
+            print(print_format.format(repository), flush=True)
+
+
+def select_tag(repository_name, tags, policy=None):
+    """Return (tag, digest) chosen by a catalog entry's "policy".
+
+    "tags" yields (tag, digest) pairs; the digest may be None.  The tag is
+    None if no tag matches.
+    """
+
+    with METRICS.phase("version_ranking", clock=time.thread_time):
+        tag_policy = TagPolicy(policy)
+        for tag, digest in tags:
+            tag_policy.observe(tag, digest)
+    logging.debug(message_debug(903, repository_name, tag_policy.answers()))
+    result = tag_policy.select()
+    if result is None:
+        logging.warning(message_warning(305, repository_name, policy or {}))
+    return result, tag_policy.select_digest()
+
+
+def latest_version_from_tags(key, repository_name, response, tags=None, policy=None):
+    """Return (version, digest) found in a tags response.
+
+    "tags" is an iterable over every tag of the repository.  It defaults to
+    the "results" of the first page.  The version is None to skip the image.
+    """
+
+    response_results = response.get("results")
+    if response_results is None:
+        print(f"Could not find {key}. Using default: latest", file=sys.stderr)
+        return "latest", None
+    if tags is None:
+        tags = response_results
+    # Only tags that cannot be ranked are caught.  Failed requests for later
+    # pages, raised while "tags" is consumed, reach the caller.
+
+    try:
+        return select_tag(repository_name, ((x.name, x.digest) for x in tags), policy)
+    except ValueError as err:
+        logging.error(message_error(901, repository_name, err))
+        return None, None
+
+
+def get_registry_version(registry_client, key, value):
+    """Return (version, source, digest) of an image in a third-party registry.
+
+    tags/list has no digests, so "digest" is None.
+
+    If the registry cannot be read or has no version tags, the pinned
+    "version" of the catalog entry is returned instead, with source "fallback".
+    """
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    start_time = time.perf_counter()
+    url_versions = value.get("url-versions")
+    source = "resolved"
+    try:
+        latest_version, _ = select_tag(
+            key,
+            ((tag, None) for tag in registry_client.iter_tags(url_versions)),
+            value.get("policy"),
+        )
+        if latest_version is None:
+            raise ValueError("No version tags")
+    except (requests.RequestException, ValueError) as err:
+        latest_version = value.get("version")
+        source = "fallback"
+        logging.warning(message_warning(304, key, url_versions, latest_version, err))
+    METRICS.observe(
+        "dockerhub_util_repository_resolution_seconds",
+        time.perf_counter() - start_time,
+        {"repository": key},
+    )
+    return latest_version, source, None
+
+
+def get_indexed_version(tag_index, organization, repository_name, policy=None):
+    """Return (version, digest) chosen from the tag index, or None.
+
+    None means the repository is not in the index, so DockerHub is asked.
+    """
+
+    if tag_index is None or not tag_index.is_synced(organization, repository_name):
+        return None
+    return select_tag(
+        repository_name, tag_index.get_tags(organization, repository_name), policy
+    )
+
+
+def get_latest_version(dockerhub_client, organization_default, key, value):
+    """Return (version, source, digest) of one Docker image.
+
+    "version" is None to skip the image.  "source" is "pinned" for versions
+    from the catalog, "resolved" for versions found in a registry, "indexed"
+    for versions found in SENZING_INDEX_FILE and "fallback" when a default
+    was used instead.  "digest" is the digest
+    listed with the tag, if any.
+    """
+
+    if value.get("url-versions"):
+        return get_registry_version(dockerhub_client.registry_client, key, value)
+    latest_version = value.get("version")
+    source = "pinned"
+    digest = None
+    if not latest_version:
+        organization = value.get("organization", organization_default)
+        repository_name = value.get("repository", key)
+        indexed = get_indexed_version(
+            dockerhub_client.tag_index,
+            organization,
+            repository_name,
+            value.get("policy"),
+        )
+        if indexed:
+            return indexed[0], "indexed", indexed[1]
+        start_time = time.perf_counter()
+        response = dockerhub_client.get_repository_tags(organization, repository_name)
+        latest_version, digest = latest_version_from_tags(
+            key,
+            repository_name,
+            response,
+            dockerhub_client.iter_results(response),
+            value.get("policy"),
+        )
+        source = "fallback" if response.get("results") is None else "resolved"
+        METRICS.observe(
+            "dockerhub_util_repository_resolution_seconds",
+            time.perf_counter() - start_time,
+            {"repository": key},
+        )
+    return latest_version, source, digest
+
+
+def image_location(organization_default, key, value):
+    """Return (registry, repository name) of a catalog entry's image.
+
+    "registry" is None for DockerHub.  Official DockerHub images, like
+    "busybox", are in the "library" namespace.
+    """
+
+    if "image" not in value:
+        return None, "{0}/{1}".format(
+            *repository_location(organization_default, key, value)
+        )
+    image = value.get("image")
+    first, _, rest = image.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        return first, rest
+    if not rest:
+        return None, "library/" + image
+    return None, image
+
+
+def manifest_url(registry, repository_name, value, version):
+    """Return the OCI manifest URL of "version" of a third-party image.
+
+    The URL is next to the entry's "url-versions", if it has one.
+    """
+
+    url_versions = value.get("url-versions", "")
+    if "/tags/list" in url_versions:
+        base_url = url_versions.split("/tags/list", 1)[0]
+    else:
+        base_url = "https://{0}/v2/{1}".format(registry, repository_name)
+    return "{0}/manifests/{1}".format(base_url, version)
+
+
+def get_digest(config, dockerhub_client, key, value, tag):
+    """Return the manifest digest of a tag of a catalog entry, or None.
+
+    "tag" is a TagRecord.  A digest listed with the tag is used as is.  Otherwise the permanent
+    digest cache is asked, then the registry: DockerHub's tag endpoint, or a
+    HEAD request for the manifest of a third-party image.
+    """
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    registry, repository_name = image_location(
+        config.get("dockerhub_organization"), key, value
+    )
+    version, digest = tag.name, tag.digest
+    reference = "{0}:{1}".format(
+        "/".join(x for x in [registry, repository_name] if x), version
+    )
+    digest_cache = dockerhub_client.digest_cache
+    if not digest and digest_cache and not config.get("revalidate_digests"):
+        digest = digest_cache.get(reference)
+        if digest:
+            return digest
+    try:
+        if digest:
+            pass
+        elif registry:
+            digest = dockerhub_client.registry_client.get_manifest_digest(
+                manifest_url(registry, repository_name, value, version)
+            )
+        else:
+            organization, name = repository_name.split("/", 1)
+            tag = dockerhub_client.get_repository_tag(organization, name, version)
+            digest = getattr(tag, "digest", None)
+    except requests.RequestException as err:
+        logging.warning(message_warning(306, reference, err))
+        return None
+    if not digest:
+        logging.warning(message_warning(306, reference, "No digest"))
+        return None
+    if digest_cache:
+        digest_cache.put(reference, digest)
+    return digest
+
+
+def load_catalog(catalog_file):
+    """Return the catalog of Docker images in a JSON or YAML file.
+
+    The file has the shape of DOCKERHUB_REPOSITORIES_FOR_LATEST: a mapping of
+    key to entry.  It is read and checked once; the result is keyed and
+    sorted, so later lookups and shard assignment need no further parsing.
+    """
+
+    with open(catalog_file, encoding="utf-8") as input_file:
+        if catalog_file.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml  # pylint: disable=import-outside-toplevel
+            except ImportError:
+                exit_error(705, catalog_file)
+            catalog = yaml.safe_load(input_file)
+        else:
+            catalog = json.load(input_file)
+    if not isinstance(catalog, dict):
+        raise ValueError("Expected a mapping of key to entry")
+    for key, value in catalog.items():
+        if not isinstance(value, dict) or not value.get("environment_variable"):
+            raise ValueError("Entry '{0}' needs an 'environment_variable'".format(key))
+        try:
+            TagPolicy(value.get("policy"))
+        except ValueError as err:
+            exit_error(714, key, catalog_file, err)
+    return dict(sorted(catalog.items()))
+
+
+def get_catalog(config):
+    """Return the catalog from SENZING_CATALOG_FILE, or the built-in catalog."""
+
+    catalog_file = config.get("catalog_file")
+    if not catalog_file:
+        return DOCKERHUB_REPOSITORIES_FOR_LATEST
+    try:
+        return load_catalog(catalog_file)
+    except (OSError, ValueError) as err:
+        exit_error(704, catalog_file, err)
+    return None
+
+
+def parse_shard(shard):
+    """Return (index, count) of an "i/n" shard, where 1 <= i <= n."""
+
+    index, count = (int(x) for x in shard.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(shard)
+    return index, count
+
+
+def shard_catalog(dockerhub_repositories, shard):
+    """Return the entries of the catalog that belong to an "i/n" shard.
+
+    Keys are assigned by CRC-32, which, unlike hash(), is the same in every
+    process, so shards run on different machines never overlap.
+    """
+
+    index, count = parse_shard(shard)
+    return {
+        key: value
+        for key, value in dockerhub_repositories.items()
+        if zlib.crc32(key.encode()) % count == index - 1
+    }
+
+
+def merge_shard_files(shard_files):
+    """Return sorted "export ..." lines from print-latest-versions outputs."""
+
+    shards = set()
+    versions = {}
+    for shard_file in shard_files:
+        with open(shard_file, encoding="utf-8") as input_file:
+            for line in input_file:
+                line = line.strip()
+                if line.startswith("# Shard: "):
+                    shards.add(parse_shard(line[len("# Shard: ") :]))
+                if not line.startswith("export "):
+                    continue
+                variable, _, version = line[len("export ") :].partition("=")
+                if versions.get(variable, version) != version:
+                    exit_error(708, variable, versions.get(variable), version)
+                versions[variable] = version
+
+    # Every shard of one split must be present exactly once.
+
+    counts = {count for _, count in shards}
+    if shards and (
+        len(counts) != 1
+        or {index for index, _ in shards} != set(range(1, max(counts) + 1))
+    ):
+        exit_error(
+            707,
+            max(counts),
+            ", ".join("{0}/{1}".format(*x) for x in sorted(shards)),
+        )
+    return sorted(
+        "export {0}={1}".format(variable, version)
+        for variable, version in versions.items()
+    )
+
+
+def repository_location(organization_default, key, value):
+    """Return (organization, repository_name) of a catalog entry."""
+    return (
+        value.get("organization", organization_default),
+        value.get("repository", key),
+    )
+
+
+def load_state(state_file):
+    """Return the state saved by a previous incremental run."""
+
+    try:
+        with open(state_file, encoding="utf-8") as input_file:
+            return json.load(input_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as err:
+        logging.warning(message_warning(301, state_file, err))
+        return {}
+
+
+def save_state(state_file, state):
+    """Atomically replace the state file."""
+
+    temporary_state_file = "{0}.{1}".format(state_file, os.getpid())
+    with open(temporary_state_file, "w", encoding="utf-8") as output_file:
+        json.dump(state, output_file, indent=2, sort_keys=True)
+    os.replace(temporary_state_file, state_file)
+
+
+def split_unchanged(state, last_updated, organization_default, dockerhub_repositories):
+    """Split the catalog into versions reused from "state" and entries to resolve.
+
+    An entry is reused only if its repository's "last_updated" is unchanged
+    since the run that resolved it.
+    """
+
+    unchanged = {}
+    changed = {}
+    for key, value in dockerhub_repositories.items():
+        previous = state.get(key, {})
+        current = last_updated.get(
+            repository_location(organization_default, key, value)
+        )
+        if (
+            not value.get("version")
+            and current
+            and previous.get("last_updated") == current
+            and previous.get("version")
+        ):
+            unchanged[key] = previous.get("version")
+        else:
+            changed[key] = value
+    return unchanged, changed
+
+
+def next_state(last_updated, organization_default, dockerhub_repositories, versions):
+    """Return the state to save after an incremental run."""
+
+    result = {}
+    for key, value in dockerhub_repositories.items():
+        version = versions.get(key)
+        current = last_updated.get(
+            repository_location(organization_default, key, value)
+        )
+        if value.get("version") or not current or version in [None, "latest"]:
+            continue
+        result[key] = {"last_updated": current, "version": version}
+    return result
+
+
+def listed_organizations(organization_default, dockerhub_repositories):
+    """Return organizations holding repositories whose versions are resolved."""
+    return sorted(
+        {
+            value.get("organization", organization_default)
+            for value in dockerhub_repositories.values()
+            if not value.get("version")
+        }
+    )
+
+
+def indexed_locations(organization_default, dockerhub_repositories):
+    """Return (organization, repository_name) of DockerHub repositories to index.
+
+    Entries with a pinned "version" are left out: their version is taken
+    from the catalog, and their digest from DockerHub's tag endpoint, so
+    nothing would read their tags from the index.  Third-party images with
+    "url-versions" are not on DockerHub at all.
+    """
+    return sorted(
+        {
+            repository_location(organization_default, key, value)
+            for key, value in dockerhub_repositories.items()
+            if not value.get("version") and not value.get("url-versions")
+        }
+    )
+
+
+def sync_repository(dockerhub_client, organization, repository_name, full=False):
+    """Index the tags of a repository added or updated since its last sync.
+
+    Tags are listed most recently updated first, so listing stops at the
+    first tag already indexed with the same "last_updated".  With "full",
+    every tag is listed, and indexed tags no longer listed are deleted.
+    Return the number of tags indexed, or None if the repository was not
+    found.
+    """
+
+    tag_index = dockerhub_client.tag_index
+    indexed = tag_index.get_last_updated(organization, repository_name)
+    response = dockerhub_client.get_repository_tags(
+        organization, repository_name, ordering="last_updated"
+    )
+    if response.get("results") is None:
+        logging.warning(message_warning(307, organization, repository_name))
+        return None
+    tags = []
+    for tag in dockerhub_client.iter_results(response, prefetch=full):
+        if indexed.get(tag.name) == tag.last_updated and not full:
+            break
+        tags.append(tag)
+    deleted = tag_index.put_tags(organization, repository_name, tags, prune=full)
+    count = len([x for x in tags if indexed.get(x.name) != x.last_updated])
+    logging.info(message_info(162, count, organization, repository_name))
+    if deleted:
+        logging.info(message_info(165, deleted, organization, repository_name))
+    return count
+
+
+def sync_index(config, dockerhub_client, dockerhub_repositories):
+    """Sync the tag index with every catalog repository, concurrently.
+
+    Return {(organization, repository_name): number of tags indexed}.
+    """
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    locations = indexed_locations(
+        config.get("dockerhub_organization"), dockerhub_repositories
+    )
+    full = config.get("full_sync", False)
+    workers = config.get("dockerhub_workers", 1)
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(workers, 1), initializer=PROFILER.start_thread
+    ) as executor:
+        counts = executor.map(
+            lambda location: sync_repository(dockerhub_client, *location, full=full),
+            locations,
+        )
+        return dict(zip(locations, counts))
+
+
+def pinned_version(record):
+    """Return the version of a record, pinned to its digest if it has one."""
+    if record.get("digest"):
+        return "{0}@{1}".format(record.get("version"), record.get("digest"))
+    return record.get("version")
+
+
+def export_lines(records):
+    """Return sorted "export ..." lines for resolved version records."""
+
+    result = [
+        "export {0}={1}".format(
+            record.get("environment_variable"), pinned_version(record)
+        )
+        for record in records
+        if record.get("version") is not None
+    ]
+    result.sort()
+    return result
+
+
+def catalog_image_name(key, value):
+    """Return the Docker image name of a catalog entry."""
+    return value.get("image", "senzing/{0}".format(key))
+
+
+def version_record(key, value, version, source, resolution_time):
+    """Return the machine-readable record of one resolved catalog entry."""
+    return {
+        "environment_variable": value.get("environment_variable"),
+        "image": catalog_image_name(key, value),
+        "resolution_time": round(resolution_time, 6),
+        "source": source,
+        "version": version,
+    }
+
+
+def resolve_version(config, dockerhub_client, key, value, version=None):
+    """Return (key, version record) of one catalog entry.
+
+    "version" is a version already known, e.g. from an incremental run's
+    state.  With SENZING_DIGESTS, the record also has the version's digest.
+    """
+
+    start_time = time.perf_counter()
+    if version:
+        source, digest = "resolved", None
+    else:
+        version, source, digest = get_latest_version(
+            dockerhub_client, config.get("dockerhub_organization"), key, value
+        )
+    record = version_record(
+        key, value, version, source, time.perf_counter() - start_time
+    )
+    if config.get("digests") and version:
+        record["digest"] = get_digest(
+            config, dockerhub_client, key, value, TagRecord(version, None, digest)
+        )
+    return key, record
+
+
+def sorted_catalog_keys(dockerhub_repositories):
+    """Return catalog keys in the order of their "export ..." lines."""
+    return sorted(
+        dockerhub_repositories,
+        key=lambda x: dockerhub_repositories[x].get("environment_variable"),
+    )
+
+
+def iter_latest_versions(config, dockerhub_client, dockerhub_repositories):
+    """Yield a version record per catalog entry as soon as it is resolved.
+
+    With SENZING_SORT_WINDOW, records are yielded sorted by environment
+    variable instead.  Entries are then submitted in that order, at most
+    "sort window" ahead of the record being yielded, which bounds how many
+    finished records wait behind a slow one.
+    """
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    organization_default = config.get("dockerhub_organization")
+    workers = config.get("dockerhub_workers", 1)
+    sort_window = config.get("sort_window", 0)
+    state_file = config.get("state_file")
+    versions = {}
+    unchanged = {}
+
+    # Incremental mode: one listing per organization tells which repositories
+    # changed since the last run.  Only those are asked for their tags.
+
+    if state_file:
+        last_updated = {}
+        for organization in listed_organizations(
+            organization_default, dockerhub_repositories
+        ):
+            for repository in dockerhub_client.iter_repositories(organization):
+                last_updated[(organization, repository.name)] = repository.last_updated
+        unchanged, _ = split_unchanged(
+            load_state(state_file),
+            last_updated,
+            organization_default,
+            dockerhub_repositories,
+        )
+
+    # Fan the per-repository lookups out over a bounded pool of workers.
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(workers, 1), initializer=PROFILER.start_thread
+    ) as executor:
+
+        def submit(key):
+            return executor.submit(
+                resolve_version,
+                config,
+                dockerhub_client,
+                key,
+                dockerhub_repositories[key],
+                unchanged.get(key),
+            )
+
+        if sort_window > 0:
+            keys = iter(sorted_catalog_keys(dockerhub_repositories))
+            futures = collections.deque(
+                submit(key) for key in itertools.islice(keys, sort_window)
+            )
+            while futures:
+                key, record = futures.popleft().result()
+                futures.extend(submit(key) for key in itertools.islice(keys, 1))
+                versions[key] = record.get("version")
+                yield record
+        else:
+            futures = [submit(key) for key in dockerhub_repositories]
+            for future in concurrent.futures.as_completed(futures):
+                key, record = future.result()
+                versions[key] = record.get("version")
+                yield record
+
+    if state_file:
+        save_state(
+            state_file,
+            next_state(
+                last_updated, organization_default, dockerhub_repositories, versions
+            ),
+        )
+
+
+def get_latest_versions(config, dockerhub_client, dockerhub_repositories):
+    """Get the latest version of Docker images."""
+
+    return export_lines(
+        iter_latest_versions(config, dockerhub_client, dockerhub_repositories)
+    )
+
+
+def write_latest_versions(config, dockerhub_client, dockerhub_repositories):
+    """Write version records to standard output as they are resolved."""
+
+    version_record_writer = VersionRecordWriter(config.get("output_format"))
+    for record in iter_latest_versions(
+        config, dockerhub_client, dockerhub_repositories
+    ):
+        version_record_writer.write(record)
+    version_record_writer.close()
+
+
+def change_event(previous_record, record):
+    """Return the event reported when a catalog entry's version changes."""
+    result = dict(record)
+    result["previous_version"] = previous_record.get("version")
+    if "digest" in previous_record:
+        result["previous_digest"] = previous_record.get("digest")
+    result["changed_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return result
+
+
+def iter_version_changes(config, dockerhub_client, dockerhub_repositories):
+    """Poll catalog entries forever, yielding an event when a version changes.
+
+    Every entry has its own polling interval.  It starts at
+    SENZING_WATCH_MIN_INTERVAL_IN_SECONDS, doubles after every poll that
+    finds no change, up to SENZING_WATCH_MAX_INTERVAL_IN_SECONDS, and drops
+    back to the minimum when the version changes.  So images that change
+    often are polled every minute and dormant ones hourly.  Polls are kept
+    in a heap by due time; polls due together run concurrently.
+
+    The first poll of an entry records its version without an event.
+    Pinned entries never change, so they are not polled.  With
+    SENZING_DIGESTS, a new digest of the same version is also a change, but
+    a digest that could not be looked up is not.  Digests are always looked
+    up again, not taken from the digest cache, so a re-pushed tag is seen.
+    """
+
+    import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    config = dict(config, revalidate_digests=True)
+    min_interval = max(config.get("watch_min_interval_in_seconds", 60), 1)
+    max_interval = max(config.get("watch_max_interval_in_seconds", 3600), min_interval)
+    workers = config.get("dockerhub_workers", 1)
+    keys = sorted(
+        key
+        for key, value in dockerhub_repositories.items()
+        if not value.get("version") or value.get("url-versions")
+    )
+    logging.info(message_info(164, len(keys)))
+    records = {}
+    intervals = dict.fromkeys(keys, min_interval)
+    start_time = time.monotonic()
+    schedule = [(start_time, key) for key in keys]
+    heapq.heapify(schedule)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(workers, 1), initializer=PROFILER.start_thread
+    ) as executor:
+        while schedule:
+            time.sleep(max(schedule[0][0] - time.monotonic(), 0))
+            now = time.monotonic()
+            futures = {}
+            while schedule and schedule[0][0] <= now:
+                key = heapq.heappop(schedule)[1]
+                future = executor.submit(
+                    resolve_version,
+                    config,
+                    dockerhub_client,
+                    key,
+                    dockerhub_repositories[key],
+                )
+                futures[future] = key
+            for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
+                try:
+                    _, record = future.result()
+                except (requests.RequestException, ValueError) as err:
+                    logging.warning(message_warning(309, key, intervals[key], err))
+                    heapq.heappush(schedule, (time.monotonic() + intervals[key], key))
+                    continue
+
+                # Fallback versions stand in for failed lookups; they are not news.
+
+                # Likewise, a missing digest of an unchanged version keeps
+                # the digest found before.
+
+                previous_record = records.get(key)
+                found = record.get("version") is not None
+                if found and record.get("source") != "fallback":
+                    changed = False
+                    if previous_record is not None:
+                        if record.get("version") != previous_record.get("version"):
+                            changed = True
+                        elif "digest" in record and not record.get("digest"):
+                            record["digest"] = previous_record.get("digest")
+                        elif record.get("digest") != previous_record.get("digest"):
+                            changed = bool(previous_record.get("digest"))
+                    records[key] = record
+                    if changed:
+                        intervals[key] = min_interval
+                        yield change_event(previous_record, record)
+                    elif previous_record is not None:
+                        intervals[key] = min(intervals[key] * 2, max_interval)
+                heapq.heappush(schedule, (time.monotonic() + intervals[key], key))
+
+
+def get_image_names(dockerhub_repositories):
+    """Get Docker images names from DockerHub."""
+
+    result = {}
+    for key, value in dockerhub_repositories.items():
+        # Skip deprecated keys.
+
+        if "deprecated" in key:
+            continue
+
+        # Add to result.
+
+        result[catalog_image_name(key, value)] = {
+            "environment_variable": value.get("environment_variable")
+        }
+
+    return result
+
+
+def render_active_image_names(config, image_names):
+    """Return the print-active-image-names report."""
+
+    print_format = config.get("print_format", "{0}")
+    return "".join(print_format.format(x) + "\n" for x in image_names)
+
+
+def render_image_names(dockerhub_repositories):
+    """Return the print-image-names report."""
+
+    response = get_image_names(dockerhub_repositories)
+    return json.dumps(response, sort_keys=True, indent=4) + "\n"
+
+
+def render_latest_versions(config, lines, shard=None):
+    """Return the print-latest-versions report, a bash script.
+
+    The report of one shard names its "i/n" shard, for merge-latest-versions.
+    """
+
+    header = [
+        "#!/usr/bin/env bash",
+        "",
+        "# Generated on {0} by https://github.com/Senzing/dockerhub-util "
+        "dockerhub-util.py version: {1} update: {2}".format(
+            date.today(), config.get("program_version"), config.get("program_updated")
+        ),
+        "",
+    ]
+    if shard:
+        header += ["# Shard: {0}".format(shard), ""]
+    return "".join(x + "\n" for x in header + lines)
+
+
+def render_report(report, config, dockerhub_client, dockerhub_repositories):
+    """Return the output of one of REPORTS, using a shared DockerHubClient."""
+
+    if report == "print-active-image-names":
+        return render_active_image_names(
+            config, get_active_image_names(config, dockerhub_client)
+        )
+    if report == "print-image-names":
+        return render_image_names(dockerhub_repositories)
+    if report == "print-latest-versions":
+        return render_latest_versions(
+            config,
+            get_latest_versions(config, dockerhub_client, dockerhub_repositories),
+        )
+    raise ValueError("Unknown report: {0}".format(report))
+
+
+def refresh_snapshot(config, dockerhub_client, snapshot, dockerhub_repositories):
+    """Render every report from DockerHub into "snapshot"."""
+
+    payloads = {
+        report: render_report(report, config, dockerhub_client, dockerhub_repositories)
+        for report in REPORTS
+    }
+    snapshot.update(payloads)
+
+
+def parse_batch_job(batch_job):
+    """Return (report, output file) of a "subcommand=output-file" batch job."""
+
+    report, separator, output_file = batch_job.partition("=")
+    if report not in REPORTS or not separator or not output_file:
+        raise ValueError(batch_job)
+    return report, output_file
+
+
+def write_report(output_file, text):
+    """Write a report to stdout ("-") or atomically replace a file with it."""
+
+    with METRICS.phase("output_rendering"):
+        if output_file == "-":
+            print(text, end="", flush=True)
+            return
+        temporary_output_file = "{0}.{1}".format(output_file, os.getpid())
+        with open(temporary_output_file, "w", encoding="utf-8") as output:
+            output.write(text)
+        os.replace(temporary_output_file, output_file)
+
+
+# -----------------------------------------------------------------------------
+# do_* functions
+#   Common function signature: do_XXX(args)
+# -----------------------------------------------------------------------------
+
+
+def do_batch(subcommand, args):
+    """Write several reports with one DockerHubClient, pool and cache."""
+
+    import tempfile  # pylint: disable=import-outside-toplevel
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+    validate_configuration(config)
+
+    # Do work.  Jobs run in order on one client.  Without SENZING_CACHE_DIR,
+    # a temporary response cache still lets later jobs reuse earlier
+    # responses.  A report asked for twice is rendered once.
+
+    batch_jobs = [parse_batch_job(x) for x in config.get("batch_jobs")]
+    dockerhub_repositories = get_catalog(config)
+    reports = {}
+    try:
+        with contextlib.ExitStack() as stack:
+            if not config.get("cache_dir"):
+                config["cache_dir"] = stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix="dockerhub-util-")
+                )
+            dockerhub_client = stack.enter_context(DockerHubClient(config))
+            for report, output_file in batch_jobs:
+                if report not in reports:
+                    reports[report] = render_report(
+                        report, config, dockerhub_client, dockerhub_repositories
+                    )
+                write_report(output_file, reports[report])
+    except requests.RequestException as err:
+        exit_error(702, err)
+    write_metrics(config)
+
+    # Epilog.
+
+    logging.info(exit_template(config))
+
+
+def do_docker_acceptance_test(subcommand, args):
     """For use with Docker acceptance testing."""
 
     # Get context from CLI, environment variables, and ini files.
@@ -855,8 +4079,8 @@ def do_docker_acceptance_test(subcommand, args):
     logging.info(exit_template(config))
 
 
-def do_print_image_names(subcommand, args):
-    """Do a task."""
+def do_merge_latest_versions(subcommand, args):
+    """Merge the outputs of sharded print-latest-versions runs."""
 
     # Get context from CLI, environment variables, and ini files.
 
@@ -868,17 +4092,20 @@ def do_print_image_names(subcommand, args):
 
     # Do work.
 
-    response = get_image_names(DOCKERHUB_REPOSITORIES_FOR_LATEST)
+    try:
+        response = merge_shard_files(config.get("shard_files") or [])
+    except (OSError, ValueError) as err:
+        exit_error(699, err)
 
-    response_json = json.dumps(response, sort_keys=True, indent=4)
-    print(response_json)
+    with METRICS.phase("output_rendering"):
+        print(render_latest_versions(config, response), end="")
 
     # Epilog.
 
     logging.info(exit_template(config))
 
 
-def do_print_active_image_names(subcommand, args):
+def do_print_image_names(subcommand, args):
     """Do a task."""
 
     # Get context from CLI, environment variables, and ini files.
@@ -889,22 +4116,39 @@ def do_print_active_image_names(subcommand, args):
 
     logging.info(entry_template(config))
 
-    # Pull variables from config.
+    # Do work.
 
-    print_format = config.get("print_format", {})
+    dockerhub_repositories = get_catalog(config)
+    with METRICS.phase("output_rendering"):
+        print(render_image_names(dockerhub_repositories), end="")
+
+    # Epilog.
+
+    logging.info(exit_template(config))
 
-    # Do work.
 
-    response = get_active_image_names(config)
+def do_print_active_image_names(subcommand, args):
+    """Do a task."""
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+    validate_configuration(config)
 
-    # Sort response.
+    # Do work.
 
-    repositories = []
-    for item in response:
-        repositories.append("{0}/{1}".format(item.get("namespace"), item.get("name")))
-    repositories.sort()
-    for repository in repositories:
-        print(print_format.format(repository))
+    try:
+        with DockerHubClient(config) as dockerhub_client:
+            print_active_image_names(config, dockerhub_client)
+    except requests.RequestException as err:
+        exit_error(702, err)
+    write_metrics(config)
 
     # Epilog.
 
@@ -914,6 +4158,8 @@ def do_print_active_image_names(subcommand, args):
 def do_print_latest_versions(subcommand, args):
     """Do a task."""
 
+    import requests  # pylint: disable=import-outside-toplevel
+
     # Get context from CLI, environment variables, and ini files.
 
     config = get_configuration(subcommand, args)
@@ -921,23 +4167,103 @@ def do_print_latest_versions(subcommand, args):
     # Prolog.
 
     logging.info(entry_template(config))
+    validate_configuration(config)
 
     # Do work.
 
-    response = get_latest_versions(config, DOCKERHUB_REPOSITORIES_FOR_LATEST)
-
-    print("#!/usr/bin/env bash")
-    print("")
-    print(
-        "# Generated on {0} by https://github.com/Senzing/dockerhub-util "
-        "dockerhub-util.py version: {1} update: {2}".format(
-            date.today(), config.get("program_version"), config.get("program_updated")
+    dockerhub_repositories = get_catalog(config)
+    if config.get("shard"):
+        dockerhub_repositories = shard_catalog(
+            dockerhub_repositories, config.get("shard")
         )
+    output_format = config.get("output_format")
+    response = []
+    try:
+        # Records are written as they are resolved.  The bash script is
+        # sorted, so it is written once complete.
+
+        if output_format != "shell":
+            with DockerHubClient(config) as dockerhub_client:
+                write_latest_versions(config, dockerhub_client, dockerhub_repositories)
+        else:
+            with DockerHubClient(config) as dockerhub_client:
+                response = get_latest_versions(
+                    config, dockerhub_client, dockerhub_repositories
+                )
+    except requests.RequestException as err:
+        exit_error(702, err)
+    write_metrics(config)
+
+    if output_format == "shell":
+        with METRICS.phase("output_rendering"):
+            print(render_latest_versions(config, response, config.get("shard")), end="")
+
+    # Epilog.
+
+    logging.info(exit_template(config))
+
+
+def do_serve(subcommand, args):
+    """Serve reports over HTTP from a periodically refreshed snapshot."""
+
+    import http.server  # pylint: disable=import-outside-toplevel
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+    validate_configuration(config)
+
+    # Pull values from configuration.
+
+    refresh_interval_in_seconds = config.get("refresh_interval_in_seconds", 3600)
+    serve_host = config.get("serve_host")
+    serve_port = config.get("serve_port")
+
+    # Refresh the snapshot in the background with one long-lived client,
+    # until "stopped" is set.
+
+    snapshot = Snapshot(2 * refresh_interval_in_seconds)
+    dockerhub_repositories = get_catalog(config)
+    dockerhub_client = DockerHubClient(config)
+    stopped = threading.Event()
+
+    def refresh_forever():
+        PROFILER.start_thread()
+        while not stopped.is_set():
+            try:
+                refresh_snapshot(
+                    config, dockerhub_client, snapshot, dockerhub_repositories
+                )
+                logging.info(message_info(160))
+            except Exception as err:
+                logging.error(message_error(703, err))
+            stopped.wait(refresh_interval_in_seconds)
+
+    refresher = threading.Thread(target=refresh_forever, daemon=True)
+    refresher.start()
+
+    # Answer requests from memory.
+
+    server = http.server.ThreadingHTTPServer(
+        (serve_host, serve_port), create_snapshot_request_handler_class()
     )
-    print("")
+    server.snapshot = snapshot
+    logging.info(message_info(161, serve_host, serve_port))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+        # A refresh in progress finishes before the client's executor shuts
+        # down; otherwise it fails to schedule its remaining requests.
 
-    for line in response:
-        print(line)
+        stopped.set()
+        refresher.join()
+        dockerhub_client.close()
 
     # Epilog.
 
@@ -976,6 +4302,75 @@ def do_sleep(subcommand, args):
     logging.info(exit_template(config))
 
 
+def do_sync_index(subcommand, args):
+    """Mirror the tags of every catalog repository into SENZING_INDEX_FILE."""
+
+    import requests  # pylint: disable=import-outside-toplevel
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+    validate_configuration(config)
+
+    # Do work.
+
+    dockerhub_repositories = get_catalog(config)
+    try:
+        with DockerHubClient(config) as dockerhub_client:
+            counts = sync_index(config, dockerhub_client, dockerhub_repositories)
+    except requests.RequestException as err:
+        exit_error(702, err)
+    write_metrics(config)
+    synced = [x for x in counts.values() if x is not None]
+    logging.info(message_info(163, len(synced), config.get("index_file")))
+
+    # Epilog.
+
+    logging.info(exit_template(config))
+
+
+def do_watch(subcommand, args):
+    """Poll the catalog and print an NDJSON event whenever a version changes."""
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+    validate_configuration(config)
+
+    # Every poll revalidates cached responses, so a change is seen by the
+    # first poll after it, not after SENZING_CACHE_TTL_IN_SECONDS.
+
+    config["cache_ttl_in_seconds"] = 0
+
+    # Do work.
+
+    dockerhub_repositories = get_catalog(config)
+    with contextlib.ExitStack() as stack:
+        output_file = None
+        if config.get("output_file"):
+            output_file = stack.enter_context(
+                open(config.get("output_file"), "a", encoding="utf-8")
+            )
+        version_record_writer = VersionRecordWriter("ndjson", output_file)
+        dockerhub_client = stack.enter_context(DockerHubClient(config))
+        for event in iter_version_changes(
+            config, dockerhub_client, dockerhub_repositories
+        ):
+            version_record_writer.write(event)
+
+    # Epilog.
+
+    logging.info(exit_template(config))
+
+
 def do_version(subcommand, args):
     """Log version information."""
 
@@ -1047,4 +4442,11 @@ if __name__ == "__main__":
 
     # Tricky code for calling function based on string.
 
-    globals()[SUBCOMMAND_FUNCTION_NAME](SUBCOMMAND, ARGS)
+    PROFILE = getattr(ARGS, "profile", None) or os.getenv("SENZING_PROFILE")
+    if PROFILE:
+        try:
+            PROFILER.runcall(globals()[SUBCOMMAND_FUNCTION_NAME], SUBCOMMAND, ARGS)
+        finally:
+            PROFILER.dump_stats(PROFILE)
+    else:
+        globals()[SUBCOMMAND_FUNCTION_NAME](SUBCOMMAND, ARGS)
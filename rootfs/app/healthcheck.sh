@@ -3,9 +3,43 @@
 # Return codes.
 
 OK=0
+NOT_OK=1
 
 # Tests.
 
 echo "Doing health test."
 
+# If "dockerhub-util.py serve" is listening, report the freshness of its snapshot.
+# Connection failures mean nothing is serving, which is healthy for other subcommands.
+
+# Ask the interface "serve" listens on; a wildcard address is asked on loopback.
+
+SERVE_HOST="${SENZING_SERVE_HOST:-127.0.0.1}"
+case "${SERVE_HOST}" in
+  0.0.0.0) SERVE_HOST="127.0.0.1" ;;
+  ::) SERVE_HOST="[::1]" ;;
+  *:*) SERVE_HOST="[${SERVE_HOST}]" ;;
+esac
+SERVE_URL="http://${SERVE_HOST}:${SENZING_SERVE_PORT:-8080}/healthz"
+
+python3 - "${SERVE_URL}" <<'END_OF_PYTHON'
+import sys
+import urllib.error
+import urllib.request
+
+try:
+    with urllib.request.urlopen(sys.argv[1], timeout=5) as response:
+        print(response.read().decode())
+except urllib.error.HTTPError as err:
+    print(err.read().decode())
+    sys.exit(1)
+except OSError:
+    pass
+END_OF_PYTHON
+
+if [ $? -ne 0 ]; then
+  echo "Snapshot is not fresh."
+  exit ${NOT_OK}
+fi
+
 exit ${OK}
@@ -0,0 +1,19 @@
+"""Load dockerhub-util.py, whose name is not importable, as a module."""
+
+import importlib.util
+import pathlib
+import sys
+
+import pytest
+
+DOCKERHUB_UTIL = pathlib.Path(__file__).resolve().parent.parent / "dockerhub-util.py"
+
+
+@pytest.fixture(name="dockerhub_util", scope="session")
+def fixture_dockerhub_util():
+    """Return dockerhub-util.py as a module."""
+    spec = importlib.util.spec_from_file_location("dockerhub_util", DOCKERHUB_UTIL)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["dockerhub_util"] = module
+    spec.loader.exec_module(module)
+    return module
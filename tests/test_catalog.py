@@ -0,0 +1,44 @@
+"""Tests of catalog files."""
+
+import json
+
+import pytest
+
+
+def write_catalog(path, catalog):
+    """Write a JSON catalog file and return its name."""
+    path.write_text(json.dumps(catalog), encoding="utf-8")
+    return str(path)
+
+
+def test_policy_pattern_is_loaded(dockerhub_util, tmp_path):
+    """A valid pattern policy loads."""
+    entry = {"environment_variable": "X", "policy": {"pattern": r"(\d+)-CU(\d+)"}}
+    catalog_file = write_catalog(tmp_path / "catalog.json", {"x": entry})
+    assert dockerhub_util.load_catalog(catalog_file) == {"x": entry}
+
+
+@pytest.mark.parametrize("pattern", [r"(\d+", r"\d+"])
+def test_bad_policy_pattern_exits(dockerhub_util, tmp_path, pattern):
+    """Patterns that do not compile, or lack a version group, stop the run."""
+    entry = {"environment_variable": "X", "policy": {"pattern": pattern}}
+    catalog_file = write_catalog(tmp_path / "catalog.json", {"x": entry})
+    with pytest.raises(SystemExit):
+        dockerhub_util.load_catalog(catalog_file)
+
+
+def test_pinned_entries_are_not_indexed(dockerhub_util):
+    """Only DockerHub entries whose version is looked up are indexed."""
+    catalog = {
+        "sshd": {},
+        "adminer": {"organization": "library", "version": "4.8.1"},
+        "x-mssql": {
+            "image": "mcr.microsoft.com/mssql/server",
+            "url-versions": "https://mcr.microsoft.com/v2/mssql/server/tags/list",
+        },
+        "console": {"repository": "senzing-console"},
+    }
+    assert dockerhub_util.indexed_locations("senzing", catalog) == [
+        ("senzing", "senzing-console"),
+        ("senzing", "sshd"),
+    ]
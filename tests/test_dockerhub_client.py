@@ -0,0 +1,22 @@
+"""Tests of DockerHubClient."""
+
+import requests
+
+URL = "http://127.0.0.1:9/v2/repositories/senzing/sshd/tags?page_size=100"
+
+
+def test_cache_hit_does_not_log_in(dockerhub_util, tmp_path):
+    """A response served from the cache needs no DockerHub token."""
+    config = {
+        "cache_dir": str(tmp_path),
+        "dockerhub_api_endpoint_v2": "http://127.0.0.1:9/v2",
+        "dockerhub_password": "password",
+        "dockerhub_username": "username",
+    }
+    result = {"count": 0, "next": None, "results": []}
+    with dockerhub_util.DockerHubClient(config) as client:
+        client.response_cache.put(
+            URL, requests.Response(), *dockerhub_util.dump_compact(result)
+        )
+        client.authenticator.login = None
+        assert client.do_request(URL) == result
@@ -0,0 +1,42 @@
+"""Tests of resolving the latest version of a DockerHub repository."""
+
+import pytest
+import requests
+
+
+class FailingSecondPageClient:
+    """DockerHubClient stand-in whose second page of tags fails."""
+
+    tag_index = None
+
+    def __init__(self, dockerhub_util):
+        self.tag_record = dockerhub_util.TagRecord
+
+    def get_repository_tags(self, *_):
+        """Return the first page of tags."""
+        return {
+            "count": 200,
+            "next": "http://127.0.0.1/page/2",
+            "results": [self.tag_record("1.0.0", "2026-01-01T00:00:00Z", None)],
+        }
+
+    def iter_results(self, response):
+        """Yield the first page, then fail like DockerHub after every retry."""
+        yield from response.get("results")
+        raise requests.HTTPError("503 Server Error")
+
+
+def test_failed_page_is_raised(dockerhub_util):
+    """A failed request for a later page is not mistaken for a bad tag."""
+    client = FailingSecondPageClient(dockerhub_util)
+    with pytest.raises(requests.HTTPError):
+        dockerhub_util.get_latest_version(client, "senzing", "sshd", {})
+
+
+def test_bad_policy_skips_the_image(dockerhub_util):
+    """A policy that cannot rank tags only skips the image."""
+    response = {"results": [dockerhub_util.TagRecord("1.0.0", None, None)]}
+    result = dockerhub_util.latest_version_from_tags(
+        "sshd", "sshd", response, policy={"unknown": True}
+    )
+    assert result == (None, None)
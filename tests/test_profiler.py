@@ -0,0 +1,28 @@
+"""Tests of --profile."""
+
+import concurrent.futures
+import pstats
+
+
+def busy_worker():
+    """Work done only in a worker thread."""
+    return sum(range(1000))
+
+
+def run_in_workers(dockerhub_util):
+    """Run busy_worker() in an executor the way dockerhub-util does."""
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=2, initializer=dockerhub_util.PROFILER.start_thread
+    ) as executor:
+        return list(executor.map(lambda _: busy_worker(), range(4)))
+
+
+def test_worker_threads_are_profiled(dockerhub_util, monkeypatch, tmp_path):
+    """Statistics of worker threads are merged into the output file."""
+    profiler = dockerhub_util.ThreadProfiler()
+    monkeypatch.setattr(dockerhub_util, "PROFILER", profiler)
+    profiler.runcall(run_in_workers, dockerhub_util)
+    profiler.dump_stats(tmp_path / "profile.out")
+    stats = pstats.Stats(str(tmp_path / "profile.out"))
+    calls = [value[1] for key, value in stats.stats.items() if key[2] == "busy_worker"]
+    assert sum(calls) == 4
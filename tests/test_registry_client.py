@@ -0,0 +1,120 @@
+"""Tests of RegistryClient against a local Bearer-token registry."""
+
+import http.server
+import json
+import threading
+
+import pytest
+
+
+class FakeRegistry(http.server.ThreadingHTTPServer):
+    """Registry that only accepts the token it issued last."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRegistryRequestHandler)
+        self.token = None
+        self.tokens_issued = 0
+        self.unauthorized = 0
+
+    @property
+    def url(self):
+        """Return the base URL of the registry."""
+        return "http://{0}:{1}".format(*self.server_address)
+
+    def rotate(self):
+        """Invalidate the token issued last, as an expired token would be."""
+        self.token = None
+
+
+class FakeRegistryRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Answer /token and /v2/{name}/tags/list requests."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer a GET request."""
+        server = self.server
+        if self.path.startswith("/token"):
+            server.tokens_issued += 1
+            server.token = "token-{0}".format(server.tokens_issued)
+            self.send_json(200, {"expires_in": 300, "token": server.token})
+        elif server.token and self.headers.get("Authorization") == (
+            "Bearer " + server.token
+        ):
+            self.send_json(200, {"name": "mssql/server", "tags": ["2022-latest"]})
+        else:
+            server.unauthorized += 1
+            challenge = 'Bearer realm="{0}/token",service="fake",scope="pull"'.format(
+                server.url
+            )
+            self.send_json(401, {}, {"WWW-Authenticate": challenge})
+
+    def send_json(self, status_code, body, headers=None):
+        """Send a JSON body."""
+        content = json.dumps(body).encode()
+        self.send_response(status_code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@pytest.fixture(name="registry")
+def fixture_registry():
+    """Run a FakeRegistry for one test."""
+    server = FakeRegistry()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_is_sent_up_front(dockerhub_util, registry):
+    """Only the first request of a repository pays a 401 round trip."""
+    client = dockerhub_util.RegistryClient({"dockerhub_backoff_in_seconds": 0})
+    url = registry.url + "/v2/mssql/server/tags/list"
+    for _ in range(3):
+        assert list(client.iter_tags(url)) == ["2022-latest"]
+    client.close()
+    assert registry.unauthorized == 1
+    assert registry.tokens_issued == 1
+
+
+def test_rejected_token_is_fetched_again(dockerhub_util, registry):
+    """A token the registry no longer accepts is replaced, not reused."""
+    client = dockerhub_util.RegistryClient({"dockerhub_backoff_in_seconds": 0})
+    url = registry.url + "/v2/mssql/server/tags/list"
+    assert list(client.iter_tags(url)) == ["2022-latest"]
+    registry.rotate()
+    assert list(client.iter_tags(url)) == ["2022-latest"]
+    assert list(client.iter_tags(url)) == ["2022-latest"]
+    client.close()
+    assert registry.unauthorized == 2
+    assert registry.tokens_issued == 2
+
+
+def test_expired_token_is_not_sent(dockerhub_util):
+    """Tokens are dropped shortly before "expires_in" runs out."""
+    tokens = dockerhub_util.RegistryTokens()
+    url = "https://mcr.example/v2/mssql/server/tags/list"
+    key = ("https://mcr.example/token", None, None)
+    tokens.challenges[tokens.repository(url)] = key
+    tokens.tokens[key] = ("token", 0.0)
+    assert tokens.get(url) is None
+
+
+def test_requests_are_counted_by_registry(dockerhub_util, registry):
+    """Registry requests are told apart from DockerHub requests in metrics."""
+    client = dockerhub_util.RegistryClient({"dockerhub_backoff_in_seconds": 0})
+    assert list(client.iter_tags(registry.url + "/v2/mssql/server/tags/list"))
+    client.close()
+    assert 'registry="{0}"'.format(registry.url.split("//", 1)[1]) in (
+        dockerhub_util.METRICS.render()
+    )
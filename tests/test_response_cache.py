@@ -0,0 +1,36 @@
+"""Tests of the on-disk response cache."""
+
+import requests
+
+URL = "http://127.0.0.1:9/v2/repositories/senzing/sshd/tags"
+
+
+def make_response(status_code, headers):
+    """Return a response with a status code and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+def test_not_modified_keeps_validators(dockerhub_util, tmp_path):
+    """A 304 without ETag or Last-Modified keeps those stored before."""
+    cache = dockerhub_util.ResponseCache(str(tmp_path), 300, 1024 * 1024)
+    headers = {"ETag": '"v1"', "Last-Modified": "Sat, 17 Oct 2026 00:00:00 GMT"}
+    cache.put(URL, make_response(200, headers), None, b"{}")
+    metadata, body = cache.get(URL)
+    cache.refresh(URL, make_response(304, {}), metadata, body)
+    refreshed_metadata, refreshed_body = cache.get(URL)
+    assert refreshed_body == b"{}"
+    assert refreshed_metadata.get("etag") == '"v1"'
+    assert refreshed_metadata.get("last_modified") == headers.get("Last-Modified")
+    assert refreshed_metadata.get("stored_at") >= metadata.get("stored_at")
+
+
+def test_not_modified_updates_validators(dockerhub_util, tmp_path):
+    """Validators a 304 does send replace those stored before."""
+    cache = dockerhub_util.ResponseCache(str(tmp_path), 300, 1024 * 1024)
+    cache.put(URL, make_response(200, {"ETag": '"v1"'}), None, b"{}")
+    metadata, body = cache.get(URL)
+    cache.refresh(URL, make_response(304, {"ETag": '"v2"'}), metadata, body)
+    assert cache.get(URL)[0].get("etag") == '"v2"'
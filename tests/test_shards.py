@@ -0,0 +1,63 @@
+"""Tests of merging the outputs of sharded print-latest-versions runs."""
+
+import pytest
+
+
+def write_shards(tmp_path, shards):
+    """Write one file per shard and return their names."""
+    result = []
+    for index, (shard, lines) in enumerate(shards):
+        shard_file = tmp_path / "shard-{0}.txt".format(index)
+        shard_file.write_text(
+            "".join(
+                ["#!/usr/bin/env bash\n", "# Shard: {0}\n".format(shard)]
+                + ["{0}\n".format(x) for x in lines]
+            ),
+            encoding="utf-8",
+        )
+        result.append(str(shard_file))
+    return result
+
+
+def test_complete_shards_are_merged(dockerhub_util, tmp_path):
+    """The lines of every shard are merged and sorted."""
+    shard_files = write_shards(
+        tmp_path,
+        [
+            ("2/2", ["export SENZING_B_VERSION=2.0.0"]),
+            ("1/2", ["export SENZING_C_VERSION=3.0.0", "export SENZING_A_VERSION=1"]),
+        ],
+    )
+    assert dockerhub_util.merge_shard_files(shard_files) == [
+        "export SENZING_A_VERSION=1",
+        "export SENZING_B_VERSION=2.0.0",
+        "export SENZING_C_VERSION=3.0.0",
+    ]
+
+
+@pytest.mark.parametrize(
+    "shards",
+    [
+        [("1/3", []), ("2/3", [])],
+        [("1/2", []), ("1/3", []), ("2/2", [])],
+    ],
+)
+def test_missing_shard_exits(dockerhub_util, tmp_path, caplog, shards):
+    """A missing shard, or shards of different splits, exit with error 707."""
+    with pytest.raises(SystemExit):
+        dockerhub_util.merge_shard_files(write_shards(tmp_path, shards))
+    assert "0707E" in caplog.text
+
+
+def test_conflicting_versions_exit(dockerhub_util, tmp_path, caplog):
+    """Different versions of one variable exit with error 708."""
+    shard_files = write_shards(
+        tmp_path,
+        [
+            ("1/2", ["export SENZING_A_VERSION=1.0.0"]),
+            ("2/2", ["export SENZING_A_VERSION=1.0.1"]),
+        ],
+    )
+    with pytest.raises(SystemExit):
+        dockerhub_util.merge_shard_files(shard_files)
+    assert "0708E" in caplog.text
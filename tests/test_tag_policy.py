@@ -0,0 +1,71 @@
+"""Tests of choosing a tag by the "policy" of a catalog entry."""
+
+import logging
+
+import pytest
+
+TAGS = [
+    "1.9.0",
+    "2.0.0",
+    "2.1.0rc1",
+    "2.0.1-debian-11-r3",
+    "2.0.1-debian-11-r12",
+    "2.0.2-debian-12-r1",
+    "latest",
+]
+
+
+def select(dockerhub_util, policy=None):
+    """Return the tag chosen from TAGS by a policy."""
+    tag, _ = dockerhub_util.select_tag("example", ((x, None) for x in TAGS), policy)
+    return tag
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [
+        (None, "2.0.0"),
+        ({"prereleases": True}, "2.1.0rc1"),
+        ({"major": 1}, "1.9.0"),
+        ({"constraint": "<2"}, "1.9.0"),
+        ({"suffix": "debian-11"}, "2.0.1-debian-11-r12"),
+        ({"suffix": "debian-12"}, "2.0.2-debian-12-r1"),
+    ],
+)
+def test_policy_selects_tag(dockerhub_util, policy, expected):
+    """Pre-releases need "prereleases"; suffix families rank by revision."""
+    assert select(dockerhub_util, policy) == expected
+
+
+def test_no_matching_tag_is_reported(dockerhub_util, caplog):
+    """A policy no tag matches selects nothing, with warning 305."""
+    with caplog.at_level(logging.WARNING):
+        assert select(dockerhub_util, {"major": 3}) is None
+    assert "0305W" in caplog.text
+
+
+def test_answers_of_one_pass(dockerhub_util):
+    """One pass finds the latest version per major line and suffix family."""
+    tag_policy = dockerhub_util.TagPolicy()
+    for tag in TAGS:
+        tag_policy.observe(tag)
+    answers = tag_policy.answers()
+    assert answers.get("latest") == "2.0.0"
+    assert answers.get("latest_by_major") == {1: "1.9.0", 2: "2.0.0"}
+    assert answers.get("latest_by_suffix") == {
+        "": "2.0.0",
+        "debian-11": "2.0.1-debian-11-r12",
+        "debian-12": "2.0.2-debian-12-r1",
+    }
+
+
+def test_parse_tag_is_cached(dockerhub_util):
+    """Tags shared by many repositories are parsed once."""
+    dockerhub_util.parse_tag.cache_clear()
+    first = dockerhub_util.parse_tag("2.0.1-debian-11-r3")
+    second = dockerhub_util.parse_tag("2.0.1-debian-11-r3")
+    assert first is second
+    assert first.suffix == "debian-11"
+    assert first.revision == 3
+    cache_info = dockerhub_util.parse_tag.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (1, 1)
@@ -0,0 +1,52 @@
+"""Tests of the "watch" subcommand."""
+
+
+class RepushedRegistryClient:
+    """RegistryClient stand-in whose tag "1.0.0" is re-pushed after a poll."""
+
+    def __init__(self):
+        self.polls = 0
+
+    def iter_tags(self, _):
+        """Yield the tags of the image; stop the test if it polls too often."""
+        self.polls += 1
+        if self.polls > 3:
+            raise RuntimeError("The re-pushed tag was not reported")
+        yield "1.0.0"
+
+    def get_manifest_digest(self, _):
+        """Return the digest of the tag as pushed before the current poll."""
+        return "sha256:{0}".format(self.polls)
+
+
+class RepushedClient:  # pylint: disable=too-few-public-methods
+    """DockerHubClient stand-in for a third-party image."""
+
+    tag_index = None
+
+    def __init__(self, dockerhub_util, cache_dir):
+        self.digest_cache = dockerhub_util.DigestCache(cache_dir)
+        self.registry_client = RepushedRegistryClient()
+
+
+def test_repushed_tag_is_reported(dockerhub_util, tmp_path):
+    """A new digest of the same tag is a change, despite the digest cache."""
+    config = {
+        "digests": True,
+        "watch_min_interval_in_seconds": 1,
+        "watch_max_interval_in_seconds": 1,
+    }
+    catalog = {
+        "example": {
+            "environment_variable": "EXAMPLE_VERSION",
+            "image": "registry.example.com/example",
+            "url-versions": "https://registry.example.com/v2/example/tags/list",
+        }
+    }
+    client = RepushedClient(dockerhub_util, tmp_path)
+    events = dockerhub_util.iter_version_changes(config, client, catalog)
+    event = next(events)
+    events.close()
+    assert event.get("version") == "1.0.0"
+    assert event.get("previous_digest") == "sha256:1"
+    assert event.get("digest") == "sha256:2"